@@ -0,0 +1,332 @@
+"""
+Background scrape jobs persisted in SQLite.
+
+POST endpoints submit a job and return immediately; a bounded worker pool
+runs it, recording the status, per-stage progress and result in the
+scrape_jobs table.
+
+With several server processes sharing the table, a worker claims a job by
+switching it from queued to running in one conditional UPDATE, so each job
+runs once. The claiming process is stored as the job's owner and refreshes
+the heartbeat of its running jobs; a running job whose heartbeat goes stale
+belonged to a process that died and is queued again. Jobs left queued are
+picked up at startup.
+
+Settings:
+    SCRAPER_JOB_WORKERS: jobs running at once per process, default 2
+    SCRAPER_JOB_HEARTBEAT: seconds between heartbeats, default 15
+"""
+#pylint: disable=  trailing-whitespace,line-too-long,broad-except,import-error
+import os
+import json
+import uuid
+import asyncio
+import inspect
+import threading
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.encoders import jsonable_encoder
+from db_model.database.database import SessionLocal
+from db_model.models import models
+from db_model.schemas import schema
+from repository.single_flight import single_flight, OWNER
+from repository import telemetry
+
+JOB_WORKERS = int(os.getenv("SCRAPER_JOB_WORKERS", "2"))
+JOB_HEARTBEAT = float(os.getenv("SCRAPER_JOB_HEARTBEAT", "15"))
+# Missed heartbeats after which a running job's owner counts as dead
+STALE_HEARTBEATS = 4
+
+JOB_STAGE_SECONDS = telemetry.registry.register(telemetry.Histogram(
+    'scrape_job_stage_seconds', 'Duration of a background job stage by outcome: done or failed.', ('kind', 'stage', 'status')))
+JOBS = telemetry.registry.register(telemetry.Counter(
+    'scrape_jobs_total', 'Finished background jobs by kind and status.', ('kind', 'status')))
+
+class JobContext:
+    """
+    Handle given to a running job for reporting progress per stage.
+    """
+
+    def __init__(self, queue, job_id, kind=''):
+        self.queue = queue
+        self.id = job_id
+        self.kind = kind
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Records a stage as running for the duration of the `with` block, then as done or failed.
+
+        Args:
+            name (str): Stage name, e.g. 'scrape'.
+        """
+        entry = {'name': name, 'status': 'running', 'started_at': datetime.utcnow(), 'finished_at': None}
+        self.stages.append(entry)
+        self.queue.update(self.id, stages=self.stages)
+        try:
+            yield
+            entry['status'] = 'done'
+        except Exception:
+            entry['status'] = 'failed'
+            raise
+        finally:
+            entry['finished_at'] = datetime.utcnow()
+            self.queue.update(self.id, stages=self.stages)
+            JOB_STAGE_SECONDS.observe(
+                (entry['finished_at'] - entry['started_at']).total_seconds(),
+                kind=self.kind, stage=name, status=entry['status'])
+
+class JobQueue:
+    """
+    Registry of job handlers and the worker pool running them.
+    """
+
+    def __init__(self, workers=JOB_WORKERS):
+        self.workers = workers
+        self.handlers = {}
+        self.coalesce = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def handler(self, kind, coalesce=None):
+        """
+        Registers a function as the handler of a job kind.
+
+        The handler is called as `handler(job, db, **params)` with a
+        JobContext and a fresh session; it may be a coroutine function.
+        Its return value is stored as the job result.
+
+        Args:
+            kind (str): Job type.
+            coalesce (callable): Optional `coalesce(**params)` returning an entity key;
+                concurrent jobs with the same key share one run.
+
+        Returns:
+            callable: The decorator.
+        """
+        def decorator(func):
+            self.handlers[kind] = func
+            if coalesce is not None:
+                self.coalesce[kind] = coalesce
+            return func
+        return decorator
+
+    def _dispatch(self, job_id):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scrape-job")
+            self._executor.submit(self._run, job_id)
+
+    def submit(self, kind, **params):
+        """
+        Persists a job and queues it for a worker.
+
+        Args:
+            kind (str): Job type, one of the registered handlers.
+            **params: JSON-serializable handler arguments.
+
+        Returns:
+            str: The job ID.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        db = SessionLocal()
+        try:
+            db.add(models.ScrapeJob(
+                id=job_id,
+                kind=kind,
+                params=json.dumps(params),
+                status='queued',
+                stages='[]',
+                created_at=datetime.utcnow()
+            ))
+            db.commit()
+        finally:
+            db.close()
+        self._dispatch(job_id)
+        return job_id
+
+    def update(self, job_id, **fields):
+        """
+        Writes job fields, serializing stages and result to JSON.
+
+        Args:
+            job_id (str): The job ID.
+            **fields: Column values to set.
+        """
+        for key in ('stages', 'result'):
+            if key in fields:
+                fields[key] = json.dumps(jsonable_encoder(fields[key]))
+        db = SessionLocal()
+        try:
+            db.query(models.ScrapeJob).filter(models.ScrapeJob.id == job_id).update(fields)
+            db.commit()
+        finally:
+            db.close()
+
+    def _claim(self, job_id):
+        """
+        Switches a queued job to running for this process; False if another worker already took it.
+        """
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            claimed = db.query(models.ScrapeJob).filter(
+                models.ScrapeJob.id == job_id,
+                models.ScrapeJob.status == 'queued'
+            ).update({'status': 'running', 'owner': OWNER, 'started_at': now, 'heartbeat_at': now, 'stages': '[]'})
+            db.commit()
+            return claimed == 1
+        finally:
+            db.close()
+
+    def _run(self, job_id):
+        if not self._claim(job_id):
+            return
+        db = SessionLocal()
+        try:
+            job = db.query(models.ScrapeJob).filter(models.ScrapeJob.id == job_id).first()
+            handler = self.handlers.get(job.kind)
+            params = json.loads(job.params or '{}')
+            context = JobContext(self, job_id, job.kind)
+            try:
+                if handler is None:
+                    raise ValueError(f"No handler for job kind {job.kind}")
+                def call():
+                    # Stages outside any scraper, such as the save, are labelled with the job kind
+                    with telemetry.scope(job.kind):
+                        if inspect.iscoroutinefunction(handler):
+                            return asyncio.run(handler(context, db, **params))
+                        return handler(context, db, **params)
+                if job.kind in self.coalesce:
+                    result = single_flight.do(f"{job.kind}:{self.coalesce[job.kind](**params)}", call)
+                else:
+                    result = call()
+                self.update(job_id, status='succeeded', result=result, finished_at=datetime.utcnow())
+                JOBS.inc(kind=job.kind, status='succeeded')
+            except Exception as e:
+                db.rollback()
+                error = getattr(e, 'detail', None) or str(e) or type(e).__name__
+                print(f"Error running job {job_id} ({job.kind}): {error}")
+                self.update(job_id, status='failed', error=str(error), finished_at=datetime.utcnow())
+                JOBS.inc(kind=job.kind, status='failed')
+        finally:
+            db.close()
+
+    def _beat(self):
+        """
+        Refreshes the heartbeat of this process's running jobs and requeues running jobs whose owner stopped beating.
+
+        Returns:
+            list: IDs of the jobs requeued.
+        """
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=JOB_HEARTBEAT * STALE_HEARTBEATS)
+        db = SessionLocal()
+        try:
+            db.query(models.ScrapeJob).filter(
+                models.ScrapeJob.status == 'running',
+                models.ScrapeJob.owner == OWNER
+            ).update({'heartbeat_at': now}, synchronize_session=False)
+            orphaned = [job_id for (job_id,) in db.query(models.ScrapeJob.id).filter(
+                models.ScrapeJob.status == 'running',
+                (models.ScrapeJob.owner == None) | (models.ScrapeJob.owner != OWNER),  # pylint: disable=singleton-comparison
+                (models.ScrapeJob.heartbeat_at == None) | (models.ScrapeJob.heartbeat_at < stale)  # pylint: disable=singleton-comparison
+            )]
+            requeued = []
+            for job_id in orphaned:
+                # Conditional, so of several processes noticing the same dead owner only one requeues the job
+                if db.query(models.ScrapeJob).filter(
+                    models.ScrapeJob.id == job_id,
+                    models.ScrapeJob.status == 'running',
+                    (models.ScrapeJob.heartbeat_at == None) | (models.ScrapeJob.heartbeat_at < stale)  # pylint: disable=singleton-comparison
+                ).update({'status': 'queued', 'owner': None}, synchronize_session=False):
+                    requeued.append(job_id)
+            db.commit()
+            return requeued
+        finally:
+            db.close()
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(JOB_HEARTBEAT):
+            try:
+                for job_id in self._beat():
+                    print(f"Requeued job {job_id} of a stopped process")
+                    self._dispatch(job_id)
+            except Exception as e:
+                print(f"Error updating job heartbeats: {e}")
+
+    def start(self):
+        """
+        Queues the jobs left queued and those of stopped processes, and starts the heartbeat.
+
+        Jobs running in other live processes are left alone.
+        """
+        self._stop.clear()
+        requeued = self._beat()
+        db = SessionLocal()
+        try:
+            job_ids = [job_id for (job_id,) in db.query(models.ScrapeJob.id).filter(models.ScrapeJob.status == 'queued')]
+        finally:
+            db.close()
+        for job_id in job_ids:
+            self._dispatch(job_id)
+        if requeued:
+            print(f"Requeued {len(requeued)} jobs of stopped processes")
+        if self._heartbeat is None or not self._heartbeat.is_alive():
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def shutdown(self, wait=False):
+        """
+        Stops the worker pool and the heartbeat. Unfinished jobs stay in the table and are requeued once their heartbeat is stale.
+
+        Args:
+            wait (bool): Whether to wait for running jobs.
+        """
+        self._stop.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+def describe(job):
+    """
+    Converts a ScrapeJob row to its API representation.
+
+    Args:
+        job (models.ScrapeJob): The job row.
+
+    Returns:
+        schema.Job: The job with decoded stages and result.
+    """
+    return schema.Job(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        stages=json.loads(job.stages or '[]'),
+        result=json.loads(job.result) if job.result else None,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+
+def accepted(job_id):
+    """
+    Builds the 202 response body for a queued job.
+
+    Args:
+        job_id (str): The job ID.
+
+    Returns:
+        schema.JobAccepted: The job reference.
+    """
+    return schema.JobAccepted(job_id=job_id, status='queued', status_url=f"/jobs/{job_id}")
+
+job_queue = JobQueue()
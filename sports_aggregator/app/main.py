@@ -3,20 +3,63 @@
 Main module for FastAPI application.
 """
 #pylint: disable=  unused-import,trailing-whitespace,line-too-long,import-error
+import time  # Standard library import
+import asyncio  # Standard library import
 import random  # Standard library import
 from sqlalchemy.orm import session  # Third-party import
-from fastapi import FastAPI, Depends  # Third-party import
+from fastapi import FastAPI, Depends, Request  # Third-party import
+from fastapi.responses import PlainTextResponse  # Third-party import
 from db_model.models import models  # First-party import
 from db_model.schemas import schema  # First-party import
 from db_model.database.database import engine, get_db  # First-party import
-from app.routers import player, teams  # First-party import
+from db_model.database.migrations import migrate  # First-party import
+from app.routers import player, teams, jobs  # First-party import
+from repository.governor import governor  # First-party import
+from repository.blocking import blocking_stats  # First-party import
+from app.scheduler import refresh_scheduler  # First-party import
+from repository import telemetry  # First-party import
 
 app = FastAPI()
 
 models.Base.metadata.create_all(engine)
 
+# Registered before the routers are included, so the schema is migrated before their startup handlers use it
+@app.on_event("startup")
+async def migrate_event():
+    """
+    Event handler migrating the database schema when the server starts, not when this module is imported.
+    """
+    try:
+        await asyncio.to_thread(migrate, engine)
+    except Exception as e:  # pylint: disable=broad-except
+        print(f"Error migrating database: {e}")
+
 app.include_router(player.router)
 app.include_router(teams.router)
+app.include_router(jobs.router)
+
+REQUEST_SECONDS = telemetry.registry.register(telemetry.Histogram(
+    'http_request_seconds', 'Latency of API requests until the response starts.', ('method', 'route', 'status')))
+
+@app.middleware('http')
+async def time_request(request: Request, call_next):
+    """
+    Middleware timing every request per route template, so /player/{player_name} is one series.
+    """
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get('route')
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, 'path', 'unmatched'),
+            status=status,
+        )
 
 @app.get('/news')
 def get_news(db: session = Depends(get_db)):
@@ -28,3 +71,32 @@ def get_news(db: session = Depends(get_db)):
     for index in random.sample(range(0, len(team_news)), 15):
         news.append(schema.Team_News.from_orm(team_news[index]))
     return news
+
+@app.get('/scraper/governor')
+def get_governor_metrics():
+    """
+    Endpoint exposing per-source request, wait and rejection counters of the scraping governor.
+    """
+    return governor.metrics()
+
+@app.get('/scraper/blocking')
+def get_blocking_metrics():
+    """
+    Endpoint exposing blocked request counts and downloaded bytes per request blocking profile.
+    """
+    return blocking_stats.metrics()
+
+@app.get('/scraper/scheduler')
+def get_scheduler_metrics():
+    """
+    Endpoint exposing the refresh scheduler's queued teams, budget use and refresh counters.
+    """
+    return refresh_scheduler.metrics()
+
+@app.get('/metrics', response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Endpoint exposing scrape stage latencies, failures, bytes fetched, rows written, job and request
+    latencies and the scheduler's queue depth and lag in the Prometheus text format.
+    """
+    return PlainTextResponse(telemetry.registry.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,46 @@
+# pylint: disable=trailing-whitespace ,import-error,line-too-long,redefined-builtin
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from db_model.models import models
+from db_model.schemas import schema
+from db_model.database.database import get_db
+from app.jobs import job_queue, describe
+
+router = APIRouter(
+    tags=['jobs'],
+    prefix='/jobs'
+)
+
+@router.on_event("startup")
+async def startup_event():
+    """
+    Event handler resuming jobs left unfinished by a previous process.
+    """
+    job_queue.start()
+
+@router.on_event("shutdown")
+async def shutdown_event():
+    """
+    Event handler stopping the job workers.
+    """
+    job_queue.shutdown()
+
+@router.get('/{id}', response_model=schema.Job, status_code=status.HTTP_200_OK)
+def get_job(id: str, db: Session = Depends(get_db)):
+    """
+    Get the status, per-stage progress and result of a scrape job.
+
+    Args:
+        id (str): Job ID.
+        db (Session): Database session.
+
+    Raises:
+        HTTPException: If the job does not exist.
+
+    Returns:
+        schema.Job: The job.
+    """
+    job = db.query(models.ScrapeJob).filter(models.ScrapeJob.id == id).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return describe(job)
@@ -1,25 +1,76 @@
 # pylint: disable=trailing-whitespace , broad-except,line-too-long,import-error
+import os
+import time
+import asyncio
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from urllib.parse import unquote
 from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from db_model.database.database import get_db
+from db_model.database.database import get_db, SessionLocal
 from db_model.schemas import schema
 from db_model.models import models
+from app.jobs import job_queue, accepted
+from repository.single_flight import single_flight
+from repository.link_cache import normalize_name
+from repository import telemetry
 from scrapper.scrapper import scrape_player_data, scrape_player_stats, scrape_player_news, scrape_player_name
+from scrapper import aio
+from scrapper.crests import claim_crest
 
 router = APIRouter(
     tags=['player'],
     prefix='/player'
 )
 
-@router.post('/{player_name}', status_code=status.HTTP_201_CREATED)
-def create_player(player_name: str, db: Session = Depends(get_db)):
+# Bounded pool for the independent scrapes of a cold player lookup
+scrape_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PLAYER_SCRAPE_WORKERS", "4")),
+    thread_name_prefix="player-scrape"
+)
+DATA_TIMEOUT = 60
+STATS_TIMEOUT = 60
+NEWS_TIMEOUT = 45
+# Players of a batch scraped at once; the browser executor bounds the actual page loads
+BATCH_CONCURRENCY = int(os.getenv("PLAYER_BATCH_CONCURRENCY", "8"))
+MAX_BATCH_SIZE = int(os.getenv("PLAYER_BATCH_MAX", "50"))
+
+BatchItem = namedtuple('BatchItem', ['name', 'status', 'official', 'data', 'stats', 'news', 'error'], defaults=[None, None, [], [], None])
+
+def collect(future, started, timeout, default, label):
     """
-    Create a new player entry in the database.
+    Waits for a scrape task until its own deadline and falls back to a default.
 
     Args:
-        player_name (str): The name of the player to be added.
+        future (Future): The submitted scrape task.
+        started (float): time.monotonic() when the task was submitted.
+        timeout (float): Seconds the task may take from submission.
+        default: Value returned on timeout, error or an empty result.
+        label (str): Name used in log messages.
+
+    Returns:
+        The task result or `default`.
+    """
+    try:
+        result = future.result(timeout=max(0, started + timeout - time.monotonic()))
+        return result if result is not None else default
+    except FuturesTimeout:
+        future.cancel()
+        print(f"Timed out scraping {label} after {timeout}s")
+    except Exception as e:
+        print(f"Error scraping {label}: {e}")
+    return default
+
+@job_queue.handler('create_player', coalesce=lambda player_name: normalize_name(player_name))
+def run_create_player(job, db: Session, player_name: str):
+    """
+    Scrape and store a new player.
+
+    Args:
+        job (JobContext): Progress handle of the job.
         db (Session): The database session.
+        player_name (str): The name of the player to be added.
 
     Raises:
         HTTPException: If player data is not found.
@@ -28,26 +79,326 @@ def create_player(player_name: str, db: Session = Depends(get_db)):
         dict: Player data.
     """
     # Scraping player data and stats
-    player_data = scrape_player_data(player_name)
-    player_stats = scrape_player_stats(player_name)
+    with job.stage('scrape_data'):
+        found = scrape_player_name(player_name)
+        player_data = scrape_player_data(found[1]) if found else None
+    with job.stage('scrape_stats'):
+        player_stats = scrape_player_stats(player_name)
+    
+    if not player_data:
+        raise HTTPException(status_code=404, detail="Player not found")
+    
+    # A player stored meanwhile, e.g. by a concurrent lookup, is not inserted twice
+    if db.query(models.Player).filter(models.Player.name == player_data.name).first():
+        return player_data
+    
+    with job.stage('save'):
+        # Create new player entry in the database
+        new_player = models.Player(**player_data.dict())
+        db.add(new_player)
+        telemetry.commit(db, 'player')
+        db.refresh(new_player)
+        
+        # Add player stats to the database
+        for stat in player_stats:
+            new_stat = models.Stats(**stat.dict(), player_id=new_player.id)
+            db.add(new_stat)
+        claim_crest(new_player)
+        
+        telemetry.commit(db, 'player_stats')
+        telemetry.count_rows('player', 'inserted', 1)
+        telemetry.count_rows('player_stats', 'inserted', len(player_stats))
+    
+    return player_data
+
+def player_exists(name: str):
+    """
+    Check whether a player is stored, on a session of its own so it can run in a worker thread.
+
+    Args:
+        name (str): The player's official name.
+
+    Returns:
+        bool: True if the player is in the database.
+    """
+    db = SessionLocal()
+    try:
+        return db.query(models.Player.id).filter(models.Player.name == name).first() is not None
+    finally:
+        db.close()
+
+async def scrape_batch_player(name: str, slots: asyncio.Semaphore):
+    """
+    Scrape one player of a batch.
+
+    The infobox is read first to learn the official name; infobox data,
+    stats and news are then scraped concurrently. Players run side by side,
+    so one player's searches overlap another's page loads. Timeouts count
+    from when each scrape starts on the browser executor, not while it
+    waits there behind other players' scrapes.
+
+    A player whose stats could not be scraped is reported as failed and
+    not stored, so a later batch scrapes it again.
+
+    Args:
+        name (str): The name as requested.
+        slots (asyncio.Semaphore): Limits the players in flight.
+
+    Returns:
+        BatchItem: The scraped data, or why there is none.
+    """
+    async with slots:
+        try:
+            found = await aio.scrape_player_name(name, timeout_from_start=True)
+            if not found:
+                return BatchItem(name, 'not_found')
+            official, infobox = found
+            if await asyncio.to_thread(player_exists, official):
+                return BatchItem(name, 'exists', official)
+            data, stats, news = await asyncio.gather(
+                aio.scrape_player_data(infobox, timeout=DATA_TIMEOUT, timeout_from_start=True),
+                aio.scrape_player_stats(official, strict=True, timeout=STATS_TIMEOUT, timeout_from_start=True),
+                aio.scrape_player_news(official, timeout=NEWS_TIMEOUT, timeout_from_start=True),
+                return_exceptions=True,
+            )
+            if isinstance(data, BaseException) or not data:
+                return BatchItem(name, 'not_found', official, error=str(data) if data else None)
+            if isinstance(stats, BaseException):
+                print(f"Error scraping player stats for {official}: {stats!r}")
+                return BatchItem(name, 'failed', official, error=f"Stats not scraped: {stats!r}")
+            if isinstance(news, BaseException):
+                print(f"Error scraping player news for {official}: {news!r}")
+            return BatchItem(
+                name, 'created', official, data,
+                stats,
+                news if isinstance(news, list) else [],
+            )
+        except Exception as e:
+            print(f"Error scraping batch player {name}: {e}")
+            return BatchItem(name, 'failed', error=str(e))
+
+def save_batch(db: Session, items):
+    """
+    Store the players of a batch that finished together, in one transaction.
+
+    Args:
+        db (Session): The batch's database session.
+        items (list): BatchItem tuples.
+
+    Returns:
+        list: schema.PlayerBatchResult for each item.
+    """
+    created = [item for item in items if item.status == 'created']
+    names = {item.official for item in items if item.official}
+    try:
+        # Players stored meanwhile, e.g. by a concurrent lookup, are not inserted twice
+        stored = {name for (name,) in db.query(models.Player.name).filter(models.Player.name.in_(names))}
+        new_players, stats = [], 0
+        for item in created:
+            if item.data.name in stored:
+                continue
+            stored.add(item.data.name)
+            new_player = models.Player(**item.data.dict())
+            new_player.stats = [models.Stats(**stat.dict()) for stat in item.stats]
+            db.add(new_player)
+            new_players.append(new_player)
+            stats += len(item.stats)
+        telemetry.commit(db, 'player')
+        telemetry.count_rows('player', 'inserted', len(new_players))
+        telemetry.count_rows('player_stats', 'inserted', stats)
+        if any([claim_crest(new_player) for new_player in new_players]):
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error saving player batch: {e}")
+        items = [item._replace(status='failed', error=str(e)) if item.status == 'created' else item for item in items]
+    players = {player.name: player for player in db.query(models.Player).filter(models.Player.name.in_(names))}
+    results = []
+    for item in items:
+        player = players.get(item.official) if item.status in ('created', 'exists') else None
+        results.append(schema.PlayerBatchResult(
+            name=item.name,
+            status=item.status,
+            player=player_response(player, item.news) if player else None,
+            error=item.error,
+        ))
+    return results
+
+async def stream_batch(names):
+    """
+    Scrape a batch of players and yield each result as an NDJSON line once it is stored.
+
+    Players finishing at the same time are written in the same transaction.
+    Closing the stream cancels the players not yet scraped.
+
+    Args:
+        names (list): Player names, without duplicates.
+
+    Yields:
+        str: One schema.PlayerBatchResult as JSON per line.
+    """
+    db = SessionLocal()
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+    pending = {asyncio.create_task(scrape_batch_player(name, slots)) for name in names}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # SQLite commits block, so the batch session is only used from a worker thread
+            for result in await asyncio.to_thread(save_batch, db, [task.result() for task in done]):
+                yield result.model_dump_json() + "\n"
+    finally:
+        for task in pending:
+            task.cancel()
+        db.close()
+
+@router.post('/batch', response_class=StreamingResponse, status_code=status.HTTP_200_OK)
+async def create_players(batch: schema.PlayerBatch):
+    """
+    Add many players at once, e.g. a whole squad.
+
+    Results are streamed as newline-delimited JSON, one
+    schema.PlayerBatchResult per player in the order they finish.
+
+    Args:
+        batch (schema.PlayerBatch): The player names.
+
+    Raises:
+        HTTPException: If the batch is empty or larger than PLAYER_BATCH_MAX.
+
+    Returns:
+        StreamingResponse: The per-player results.
+    """
+    # The same player asked for twice is scraped once
+    unique = {}
+    for name in batch.names:
+        if name.strip():
+            unique.setdefault(normalize_name(name), name.strip())
+    names = list(unique.values())
+    if not names:
+        raise HTTPException(status_code=400, detail="No player names given")
+    if len(names) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} players per batch")
+    return StreamingResponse(stream_batch(names), media_type="application/x-ndjson")
+
+@router.post('/{player_name}', response_model=schema.JobAccepted, status_code=status.HTTP_202_ACCEPTED)
+def create_player(player_name: str):
+    """
+    Queue a job creating a new player entry in the database.
+
+    Args:
+        player_name (str): The name of the player to be added.
+
+    Returns:
+        schema.JobAccepted: The queued job; its result is the player data.
+    """
+    return accepted(job_queue.submit('create_player', player_name=player_name))
+
+def player_response(player, news):
+    """
+    Build the response for a stored player.
+
+    Args:
+        player (models.Player): The stored player.
+        news (list): News items for the player.
+
+    Returns:
+        schema.ShowPlayer: Player data, stats, and news.
+    """
+    # Prepare player stats
+    player_stats = [
+        schema.ShowStats(
+            tournament=str(stat.tournament),
+            apps=str(stat.apps),
+            goals=str(stat.goals),
+            assists=str(stat.assists),
+            yellow=str(stat.yellow),
+            red=str(stat.red),
+            motm=str(stat.motm),
+            rating=str(stat.rating),
+        )
+        for stat in player.stats
+    ]
+
+    # Prepare response with player data, stats, and news
+    return schema.ShowPlayer(
+        name=player.name,
+        country=player.country,
+        height=player.height,
+        positions=player.positions,
+        age=player.age,
+        shirt_no=str(player.shirt_no),
+        player_img=player.player_img,
+        club_img=player.club_img,
+        stats=player_stats,
+        news=news,
+    )
+
+def show_player(player):
+    """
+    Build the response for a player already in the database, with fresh news.
+
+    Args:
+        player (models.Player): The stored player.
+
+    Returns:
+        schema.ShowPlayer: Player data, stats, and news.
+    """
+    # Scrape player news
+    started = time.monotonic()
+    player_news = collect(scrape_executor.submit(scrape_player_news, player.name), started, NEWS_TIMEOUT, [], "player news")
+    return player_response(player, player_news)
+
+def scrape_new_player(db: Session, player_name: str, infobox):
+    """
+    Scrape and store a player missing from the database.
+
+    Runs under single-flight coalescing, so the database is checked again
+    first: another caller may have stored the player meanwhile.
+
+    Args:
+        db (Session): The database session.
+        player_name (str): The player's official name.
+        infobox (InfoboxRecord): The player's parsed Wikipedia infobox.
+
+    Raises:
+        HTTPException: If player data is not found.
+
+    Returns:
+        schema.ShowPlayer: Player data, stats, and news.
+    """
+    player = db.query(models.Player).filter(models.Player.name == player_name).first()
+    if player:
+        return show_player(player)
+    
+    # Scrape infobox, stats and news concurrently
+    started = time.monotonic()
+    data_future = scrape_executor.submit(scrape_player_data, infobox)
+    stats_future = scrape_executor.submit(scrape_player_stats, player_name)
+    news_future = scrape_executor.submit(scrape_player_news, player_name)
+    
+    player_data = collect(data_future, started, DATA_TIMEOUT, None, "player data")
+    player_stats = collect(stats_future, started, STATS_TIMEOUT, [], "player stats")
+    player_news = collect(news_future, started, NEWS_TIMEOUT, [], "player news")
     
     if not player_data:
         raise HTTPException(status_code=404, detail="Player not found")
     
-    # Create new player entry in the database
     new_player = models.Player(**player_data.dict())
     db.add(new_player)
-    db.commit()
+    telemetry.commit(db, 'player')
     db.refresh(new_player)
     
     # Add player stats to the database
     for stat in player_stats:
         new_stat = models.Stats(**stat.dict(), player_id=new_player.id)
         db.add(new_stat)
+    claim_crest(new_player)
     
-    db.commit()
+    telemetry.commit(db, 'player_stats')
+    telemetry.count_rows('player', 'inserted', 1)
+    telemetry.count_rows('player_stats', 'inserted', len(player_stats))
     
-    return player_data
+    return player_response(new_player, player_news)
 
 @router.get('/{player_name}', response_model=schema.ShowPlayer, status_code=status.HTTP_200_OK)
 def get_player(player_name: str, db: Session = Depends(get_db)):
@@ -67,104 +418,18 @@ def get_player(player_name: str, db: Session = Depends(get_db)):
     # Decode player name from URL path
     decoded_player_name = unquote(player_name)
     
-    # Scrape player name and soup
-    player_name, soup = scrape_player_name(decoded_player_name)
+    # Scrape player name and infobox
+    found = scrape_player_name(decoded_player_name)
     
-    if not player_name:
+    if not found:
         raise HTTPException(status_code=404, detail="Player not found")
+    player_name, infobox = found
     
     # Query player from database
     player = db.query(models.Player).filter(models.Player.name == player_name).first()
     
     if player:
-        # Prepare player stats
-        player_stats = [
-            schema.ShowStats(
-                tournament=str(stat.tournament),
-                apps=str(stat.apps),
-                goals=str(stat.goals),
-                assists=str(stat.assists),
-                yellow=str(stat.yellow),
-                red=str(stat.red),
-                motm=str(stat.motm),
-                rating=str(stat.rating),
-            )
-            for stat in player.stats
-        ]
-        
-        # Scrape player news
-        player_news = scrape_player_news(player_name)
-        
-        # Prepare response with player data, stats, and news
-        player_data = schema.ShowPlayer(
-            name=player.name,
-            country=player.country,
-            height=player.height,
-            positions=player.positions,
-            age=player.age,
-            shirt_no=str(player.shirt_no),
-            player_img=player.player_img,
-            club_img=player.club_img,
-            stats=player_stats,
-            news=player_news,
-        )
-        
-        return player_data
-    
-    # If player not found in database, create new entry
-    player_data = scrape_player_data(soup)
-    player_stats = scrape_player_stats(player_name)
-    player_news = scrape_player_news(player_name)
-    
-    new_player = models.Player(**player_data.dict())
-    db.add(new_player)
-    db.commit()
-    db.refresh(new_player)
-    
-    # Add player stats to the database
-    for stat in player_stats:
-        new_stat = models.Stats(**stat.dict(), player_id=new_player.id)
-        db.add(new_stat)
-    
-    db.commit()
-    
-    # Prepare stats for response
-    player_stats_response = [
-        schema.ShowStats(
-            tournament=str(stat.tournament),
-            apps=str(stat.apps),
-            goals=str(stat.goals),
-            assists=str(stat.assists),
-            yellow=str(stat.yellow),
-            red=str(stat.red),
-            motm=str(stat.motm),
-            rating=str(stat.rating),
-        )
-        for stat in player_stats
-    ]
-    
-    # Prepare news for response
-    player_news_response = [
-        schema.NewsBase(
-            news_img=str(news.news_img),
-            news_link=str(news.news_link),
-            news_title=str(news.news_title),
-        )
-        for news in player_news
-    ]
-    
-    # Prepare response with newly created player data, stats, and news
-    show_data = schema.ShowPlayer(
-        name=new_player.name,
-        country=new_player.country,
-        height=new_player.height,
-        positions=new_player.positions,
-        age=new_player.age,
-        shirt_no=str(new_player.shirt_no),
-        player_img=new_player.player_img,
-        club_img=new_player.club_img,
-        stats=player_stats_response,
-        news=player_news_response,
-    )
+        return show_player(player)
     
-    return show_data
+    # If player not found in database, scrape it once however many requests ask for it
+    return single_flight.do(f"player:{normalize_name(player_name)}", scrape_new_player, db, player_name, infobox)
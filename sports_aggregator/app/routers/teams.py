@@ -3,13 +3,19 @@ import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from scrapper.scrapper_team import (
-    scrape_fixtures, scrape_stats, scrape_players,
-    scrape_name_image, scrape_news
+    scrape_fixtures, scrape_stats, scrape_players, scrape_name_image
 )
+from scrapper import aio
 from db_model.models import models
 from db_model.schemas import schema
 from scrapper.finder import find_team_link, team_player_link, team_news_link
 from db_model.database.database import get_db
+from app.sync import sync_rows, sync_team_rows, save_rows
+from app.jobs import job_queue, accepted
+from app.scheduler import refresh_scheduler, TICK_SECONDS
+from repository.link_cache import normalize_name
+from repository.leader import LeaderLease
+from repository import telemetry
 from fuzzywuzzy import fuzz
 from apscheduler.schedulers.background import BackgroundScheduler
 
@@ -49,118 +55,121 @@ def get_most_similar_teams(teams, team_name: str, threshold: int = 60):
     ]
     return most_similar_teams
 
-async def update_team_data(db: Session, team_name: str):
+@refresh_scheduler.handler('fixtures')
+@telemetry.instrumented
+async def refresh_fixtures(db: Session, team):
     """
-    Update team data including fixtures, stats, players, and news.
+    Refresh a team's fixtures from its WhoScored page.
 
     Args:
         db (Session): Database session.
-        team_name (str): Name of the team to update.
+        team (models.Team): The team.
 
-    Raises:
-        HTTPException: If the team is not found.
-    """
-    team = db.query(models.Team).filter(models.Team.team_name == team_name).first()
-    if not team:
-        raise HTTPException(status_code=404, detail="Team not found")
-
-    link = find_team_link(team_name)
-
-    # Update fixtures
-    fixtures = scrape_fixtures(link)
-    if fixtures:
-        db.query(models.MatchFixtures).filter(models.MatchFixtures.team_id == team.id).delete()
-        for fixture in fixtures:
-            db_fixture = models.MatchFixtures(**fixture, team_id=team.id)
-            db.add(db_fixture)
-        db.commit()
-
-    # Update stats
-    stats = scrape_stats(link)
-    if stats:
-        db.query(models.TeamStats).filter(models.TeamStats.team_id == team.id).delete()
-        for stat in stats:
-            db_stat = models.TeamStats(**stat, team_id=team.id)
-            db.add(db_stat)
-        db.commit()
-
-    # Update players
-    player_link = team_player_link(team_name)
-    players = scrape_players(player_link)
-    if players:
-        db.query(models.TeamPlayers).filter(models.TeamPlayers.team_id == team.id).delete()
-        for player in players:
-            db_player = models.TeamPlayers(**player, team_id=team.id)
-            db.add(db_player)
-        db.commit()
-
-    # Update news
-    news_link = team_news_link(team_name)
-    try:
-        news_items = await scrape_news(news_link)
-        if news_items:
-            similar_teams = get_most_similar_teams(db.query(models.Team_News).all(), team_name)
-            if similar_teams:
-                db.query(models.Team_News).filter(
-                    models.Team_News.team_name.in_([team.team_name for team in similar_teams])
-                ).delete()
-                db.commit()
-                for item in news_items:
-                    db_news = models.Team_News(**item, team_name=team_name)
-                    db.add(db_news)
-                db.commit()
-    except Exception as e:
-        print(f"Error scraping news: {e}")
-
-def update_team_data_background(team_name: str, db: Session):
-    """
-    Update team data in the background.
+    Returns:
+        dict: The sync summary, or None if no fixtures were scraped.
+    """
+    link = await aio.find_team_link(team.team_name)
+    # Fixtures and stats read the same page; a stats refresh due at the same time reuses the load
+    fixtures = await aio.scrape_fixtures(link)
+    return sync_team_rows(db, team, 'fixtures', fixtures) if fixtures else None
+
+@refresh_scheduler.handler('stats')
+@telemetry.instrumented
+async def refresh_stats(db: Session, team):
+    """
+    Refresh a team's stats from its WhoScored page.
 
     Args:
-        team_name (str): Name of the team to update.
         db (Session): Database session.
+        team (models.Team): The team.
+
+    Returns:
+        dict: The sync summary, or None if no stats were scraped.
     """
-    loop = asyncio.get_event_loop()
-    loop.run_in_executor(None, lambda: asyncio.run(update_team_data(db, team_name)))
+    link = await aio.find_team_link(team.team_name)
+    stats = await aio.scrape_stats(link)
+    return sync_team_rows(db, team, 'stats', stats) if stats else None
 
-scheduler = BackgroundScheduler()
-scheduler.add_job(lambda: asyncio.run(update_all_team_data()), 'interval', hours=0.125)
+@refresh_scheduler.handler('players')
+@telemetry.instrumented
+async def refresh_players(db: Session, team):
+    """
+    Refresh a team's squad from Transfermarkt.
 
-async def update_all_team_data():
+    Args:
+        db (Session): Database session.
+        team (models.Team): The team.
+
+    Returns:
+        dict: The sync summary, or None if no players were scraped.
+    """
+    player_link = await aio.team_player_link(team.team_name)
+    players = await aio.scrape_players(player_link)
+    return sync_team_rows(db, team, 'players', players) if players else None
+
+@refresh_scheduler.handler('news')
+@telemetry.instrumented
+async def refresh_news(db: Session, team):
     """
-    Update data for all teams.
+    Refresh a team's news from ESPN.
+
+    Args:
+        db (Session): Database session.
+        team (models.Team): The team.
 
     Returns:
-        None
+        dict: The sync summary, or None if no news was scraped.
     """
-    db = next(get_db())
-    teams = db.query(models.Team).all()
-    for team in teams:
-        update_team_data_background(team.team_name, db)
+    news_link = await aio.team_news_link(team.team_name)
+    news_items = await aio.scrape_news(news_link)
+    if not news_items:
+        return None
+    similar_teams = get_most_similar_teams(db.query(models.Team_News).all(), team.team_name)
+    # A team without stored news is seeded under its own name
+    team_names = [item.team_name for item in similar_teams] or [team.team_name]
+    return sync_rows(
+        db, team.id, 'news',
+        [{**item, 'team_name': team.team_name} for item in news_items],
+        db.query(models.Team_News).filter(models.Team_News.team_name.in_(team_names))
+    )
+
+scheduler = BackgroundScheduler()
+# Every worker process ticks, but only the lease holder runs rounds
+scheduler_lease = LeaderLease('scheduler')
+refresh_scheduler.lease = scheduler_lease
+# Each tick runs the most overdue dataset refreshes, within the scheduler's budget
+scheduler.add_job(refresh_scheduler.tick, 'interval', seconds=TICK_SECONDS)
 
 @router.on_event("startup")
 async def startup_event():
     """
     Event handler for the application startup event.
     """
+    await asyncio.to_thread(scheduler_lease.start)
     scheduler.start()
 
 @router.on_event("shutdown")
 async def shutdown_event():
     """
     Event handler for the application shutdown event.
+
+    Stops scheduling rounds, lets running team refreshes finish, then hands
+    the scheduler lease to another process.
     """
     scheduler.shutdown()
+    await asyncio.to_thread(refresh_scheduler.shutdown)
+    await asyncio.to_thread(scheduler_lease.stop)
 
-@router.post('/fixtures/{id}/{team_name}', status_code=status.HTTP_201_CREATED)
-def add_fixtures(team_name: str, id: int, db: Session = Depends(get_db)):
+@job_queue.handler('add_fixtures', coalesce=lambda team_name, id: f"{id}:{normalize_name(team_name)}")
+def run_add_fixtures(job, db: Session, team_name: str, id: int):
     """
-    Add fixtures for a team.
+    Scrape and store fixtures for a team.
 
     Args:
+        job (JobContext): Progress handle of the job.
+        db (Session): Database session.
         team_name (str): Name of the team.
         id (int): Team ID.
-        db (Session): Database session.
 
     Raises:
         HTTPException: If fixtures are not found.
@@ -168,30 +177,43 @@ def add_fixtures(team_name: str, id: int, db: Session = Depends(get_db)):
     Returns:
         list: List of added fixtures.
     """
-    link = find_team_link(team_name)
-    fixtures = scrape_fixtures(link)
+    with job.stage('find_link'):
+        link = find_team_link(team_name)
+    with job.stage('scrape'):
+        fixtures = scrape_fixtures(link)
     
     if not fixtures:
         raise HTTPException(status_code=404, detail="Fixtures not found")
     
-    tasks = []
-    for fixture in fixtures:
-        db_fixture = models.MatchFixtures(**fixture, team_id=id)
-        db.add(db_fixture)
-        tasks.append(db_fixture)
-
-    db.commit()
-    return [schema.MatchFixtures.from_orm(item) for item in tasks]
+    with job.stage('save'):
+        # Rows already stored for the team are updated rather than duplicated
+        stored = save_rows(db, 'fixtures', fixtures, team_id=id)
+    return [schema.MatchFixtures.from_orm(item) for item in stored]
 
-@router.post('/players/{id}/{team_name}', status_code=status.HTTP_201_CREATED)
-def add_players(team_name: str, id: int, db: Session = Depends(get_db)):
+@router.post('/fixtures/{id}/{team_name}', response_model=schema.JobAccepted, status_code=status.HTTP_202_ACCEPTED)
+def add_fixtures(team_name: str, id: int):
     """
-    Add players for a team.
+    Queue a job adding fixtures for a team.
 
     Args:
         team_name (str): Name of the team.
         id (int): Team ID.
+
+    Returns:
+        schema.JobAccepted: The queued job; its result is the list of added fixtures.
+    """
+    return accepted(job_queue.submit('add_fixtures', team_name=team_name, id=id))
+
+@job_queue.handler('add_players', coalesce=lambda team_name, id: f"{id}:{normalize_name(team_name)}")
+def run_add_players(job, db: Session, team_name: str, id: int):
+    """
+    Scrape and store players for a team.
+
+    Args:
+        job (JobContext): Progress handle of the job.
         db (Session): Database session.
+        team_name (str): Name of the team.
+        id (int): Team ID.
 
     Raises:
         HTTPException: If players are not found.
@@ -199,30 +221,43 @@ def add_players(team_name: str, id: int, db: Session = Depends(get_db)):
     Returns:
         list: List of added players.
     """
-    link = team_player_link(team_name)
-    players = scrape_players(link)
+    with job.stage('find_link'):
+        link = team_player_link(team_name)
+    with job.stage('scrape'):
+        players = scrape_players(link)
     
     if not players:
         raise HTTPException(status_code=404, detail="Players not found")
     
-    tasks = []
-    for player in players:
-        db_player = models.TeamPlayers(**player, team_id=id)
-        db.add(db_player)
-        tasks.append(db_player)
+    with job.stage('save'):
+        # Rows already stored for the team are updated rather than duplicated
+        stored = save_rows(db, 'players', players, team_id=id)
+    return [schema.TeamPlayers.from_orm(item) for item in stored]
 
-    db.commit()
-    return [schema.TeamPlayers.from_orm(item) for item in tasks]
-
-@router.post('/stats/{id}/{team_name}', status_code=status.HTTP_201_CREATED)
-def add_stats(team_name: str, id: int, db: Session = Depends(get_db)):
+@router.post('/players/{id}/{team_name}', response_model=schema.JobAccepted, status_code=status.HTTP_202_ACCEPTED)
+def add_players(team_name: str, id: int):
     """
-    Add stats for a team.
+    Queue a job adding players for a team.
 
     Args:
         team_name (str): Name of the team.
         id (int): Team ID.
+
+    Returns:
+        schema.JobAccepted: The queued job; its result is the list of added players.
+    """
+    return accepted(job_queue.submit('add_players', team_name=team_name, id=id))
+
+@job_queue.handler('add_stats', coalesce=lambda team_name, id: f"{id}:{normalize_name(team_name)}")
+def run_add_stats(job, db: Session, team_name: str, id: int):
+    """
+    Scrape and store stats for a team.
+
+    Args:
+        job (JobContext): Progress handle of the job.
         db (Session): Database session.
+        team_name (str): Name of the team.
+        id (int): Team ID.
 
     Raises:
         HTTPException: If stats are not found.
@@ -230,40 +265,74 @@ def add_stats(team_name: str, id: int, db: Session = Depends(get_db)):
     Returns:
         list: List of added stats.
     """
-    link = find_team_link(team_name)
-    stats = scrape_stats(link)
+    with job.stage('find_link'):
+        link = find_team_link(team_name)
+    with job.stage('scrape'):
+        stats = scrape_stats(link)
     
     if not stats:
         raise HTTPException(status_code=404, detail="Stats not found")
     
-    tasks = []
-    for stat in stats:
-        db_stat = models.TeamStats(**stat, team_id=id)
-        db.add(db_stat)
-        tasks.append(db_stat)
+    with job.stage('save'):
+        # Rows already stored for the team are updated rather than duplicated
+        stored = save_rows(db, 'stats', stats, team_id=id)
+    return [schema.TeamStats.from_orm(item) for item in stored]
 
-    db.commit()
-    return [schema.TeamStats.from_orm(item) for item in tasks]
-
-@router.post('/{team_name}', status_code=status.HTTP_201_CREATED)
-def add_team(team_name: str, db: Session = Depends(get_db)):
+@router.post('/stats/{id}/{team_name}', response_model=schema.JobAccepted, status_code=status.HTTP_202_ACCEPTED)
+def add_stats(team_name: str, id: int):
     """
-    Add a team.
+    Queue a job adding stats for a team.
 
     Args:
         team_name (str): Name of the team.
+        id (int): Team ID.
+
+    Returns:
+        schema.JobAccepted: The queued job; its result is the list of added stats.
+    """
+    return accepted(job_queue.submit('add_stats', team_name=team_name, id=id))
+
+@job_queue.handler('add_team', coalesce=lambda team_name: normalize_name(team_name))
+def run_add_team(job, db: Session, team_name: str):
+    """
+    Scrape and store a team's name and image.
+
+    Args:
+        job (JobContext): Progress handle of the job.
         db (Session): Database session.
+        team_name (str): Name of the team.
 
     Returns:
         schema.Team: Added team object.
     """
-    link = find_team_link(team_name)
-    team_data = scrape_name_image(link)
-    db_team = models.Team(**team_data)
-    db.add(db_team)
-    db.commit()
+    with job.stage('find_link'):
+        link = find_team_link(team_name)
+    with job.stage('scrape'):
+        team_data = scrape_name_image(link)
+    # A team added meanwhile, e.g. by another process, is returned instead of duplicated
+    existing = db.query(models.Team).filter(models.Team.team_name == team_data['team_name']).first()
+    if existing:
+        return schema.Team.from_orm(existing)
+    with job.stage('save'):
+        db_team = models.Team(**team_data)
+        db.add(db_team)
+        telemetry.commit(db, 'team')
+        telemetry.count_rows('team', 'inserted', 1)
     return schema.Team.from_orm(db_team)
 
+@router.post('/{team_name}', response_model=schema.JobAccepted, status_code=status.HTTP_202_ACCEPTED)
+def add_team(team_name: str):
+    """
+    Queue a job adding a team.
+
+    Args:
+        team_name (str): Name of the team.
+
+    Returns:
+        schema.JobAccepted: The queued job; its result is the added team.
+    """
+    return accepted(job_queue.submit('add_team', team_name=team_name))
+
 @router.get('/{team_name}')
 def get_team(team_name: str, db: Session = Depends(get_db)):
     """
@@ -282,17 +351,19 @@ def get_team(team_name: str, db: Session = Depends(get_db)):
     teams = db.query(models.Team).all()
     for team in teams:
         if is_similar(team.team_name, team_name):
+            refresh_scheduler.record_read(db, team.id)
             return schema.Team.from_orm(team)
     raise HTTPException(status_code=404, detail="Team not found")
 
-@router.post('/news/{team_name}')
-async def add_news(team_name: str, db: Session = Depends(get_db)):
+@job_queue.handler('add_news', coalesce=lambda team_name: normalize_name(team_name))
+async def run_add_news(job, db: Session, team_name: str):
     """
-    Add news for a team.
+    Scrape and store news for a team.
 
     Args:
-        team_name (str): Name of the team.
+        job (JobContext): Progress handle of the job.
         db (Session): Database session.
+        team_name (str): Name of the team.
 
     Raises:
         HTTPException: If news is not found.
@@ -300,21 +371,33 @@ async def add_news(team_name: str, db: Session = Depends(get_db)):
     Returns:
         list: List of added news items.
     """
-    link = team_news_link(team_name)
+    with job.stage('find_link'):
+        link = await aio.team_news_link(team_name)
     print(link)
     try:
-        news = []
-        news_items = await scrape_news(link)
+        with job.stage('scrape'):
+            news_items = await aio.scrape_news(link)
         print(news_items)
-        for item in news_items:
-            db_news = models.Team_News(**item, team_name=team_name)
-            db.add(db_news)
-            news.append(schema.Team_News.from_orm(item))
-        db.commit()
+        with job.stage('save'):
+            stored = save_rows(db, 'news', [{**item, 'team_name': team_name} for item in news_items])
+            news = [schema.Team_News.from_orm(item) for item in stored]
         return news
     except:
         raise HTTPException(status_code=404, detail="News not found")
 
+@router.post('/news/{team_name}', response_model=schema.JobAccepted, status_code=status.HTTP_202_ACCEPTED)
+def add_news(team_name: str):
+    """
+    Queue a job adding news for a team.
+
+    Args:
+        team_name (str): Name of the team.
+
+    Returns:
+        schema.JobAccepted: The queued job; its result is the list of added news items.
+    """
+    return accepted(job_queue.submit('add_news', team_name=team_name))
+
 @router.get('/news/{team_name}')
 def get_news(team_name: str, db: Session = Depends(get_db)):
     """
@@ -333,4 +416,8 @@ def get_news(team_name: str, db: Session = Depends(get_db)):
     teams = get_most_similar_teams(db.query(models.Team_News).all(), team_name)
     if not teams:
         raise HTTPException(status_code=404, detail="No news found for this team")
+    for team in db.query(models.Team).all():
+        if is_similar(team.team_name, team_name):
+            refresh_scheduler.record_read(db, team.id)
+            break
     return [schema.Team_News.from_orm(item) for item in teams]
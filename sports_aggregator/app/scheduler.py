@@ -0,0 +1,531 @@
+"""
+Priority-driven refresh of team data, one job per dataset.
+
+Each dataset of each team (fixtures, stats, squad, news) is its own refresh
+job with its own interval. The interval adapts to the changes seen: it
+backs off while scrapes return identical data and tightens when they differ,
+within bounds per dataset. Each job keeps its last success timestamp in the
+refresh_states table.
+
+Each tick ranks the jobs by how overdue they are: the time since their last
+success divided by their target freshness. The target is the job's interval
+scaled by the team's context: short around a fixture and for teams read
+recently, long for teams nobody has looked at in a while. Overdue jobs go
+into a priority queue and the most overdue run first, within a global
+budget of refreshes per window; the rest wait for a later tick.
+
+Due jobs of the same team run together on one worker of a fixed pool, with
+a session per team job. A team still refreshing is skipped until it is done,
+and no more jobs are taken from the queue while the pool's backlog is full.
+
+With several server processes only the holder of the scheduler lease (see
+repository/leader.py) runs rounds; the others take over if it dies.
+
+Settings:
+    SCHEDULER_WORKERS: team jobs running at once, default the number of cores
+    SCHEDULER_TICK_SECONDS: how often the queue is rebuilt and drained
+    SCHEDULER_BUDGET: dataset refreshes allowed per budget window
+    SCHEDULER_BUDGET_WINDOW: the budget window in seconds
+"""
+#pylint: disable=  trailing-whitespace,line-too-long,broad-except,import-error
+import os
+import time
+import heapq
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, deque, namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from db_model.database.database import SessionLocal
+from db_model.models import models
+from repository import telemetry
+
+TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "60"))
+BUDGET = int(os.getenv("SCHEDULER_BUDGET", "40"))
+BUDGET_WINDOW = float(os.getenv("SCHEDULER_BUDGET_WINDOW", "3600"))
+WORKERS = int(os.getenv("SCHEDULER_WORKERS", str(os.cpu_count() or 2)))
+
+# How old a team's data may get before it is due again
+MATCHDAY_FRESHNESS = timedelta(minutes=15)
+NEAR_FIXTURE_FRESHNESS = timedelta(hours=1)
+DEFAULT_FRESHNESS = timedelta(hours=6)
+RECENT_READ_FRESHNESS = timedelta(minutes=30)
+NEAR_FIXTURE_DAYS = 2
+RECENT_READ = timedelta(hours=1)
+IDLE_READ = timedelta(days=7)
+IDLE_FACTOR = 4
+
+# Interval bounds per dataset: a Transfermarkt squad changes a few times a season, ESPN news hourly
+DatasetInterval = namedtuple('DatasetInterval', ['initial', 'minimum', 'maximum'])
+DATASET_INTERVALS = {
+    'fixtures': DatasetInterval(timedelta(hours=6), timedelta(hours=1), timedelta(days=2)),
+    'stats': DatasetInterval(timedelta(hours=12), timedelta(hours=2), timedelta(days=3)),
+    'players': DatasetInterval(timedelta(days=2), timedelta(hours=12), timedelta(days=14)),
+    'news': DatasetInterval(timedelta(hours=1), timedelta(minutes=15), timedelta(hours=12)),
+}
+BACKOFF = 1.5
+TIGHTEN = 0.5
+
+# Reads are written at most this often per team
+READ_WRITE_INTERVAL = 60
+
+FIXTURE_DATE_FORMAT = "%d-%m-%y"
+
+RefreshTask = namedtuple('RefreshTask', ['priority', 'team_id', 'team_name', 'dataset', 'staleness', 'target'])
+RefreshTask.__doc__ = """
+A due dataset refresh: `priority` is staleness / target, so 1.0 means just due.
+"""
+
+def fixture_day(date):
+    """
+    Parses a WhoScored fixture date such as '19-05-24'.
+
+    Args:
+        date (str): The fixture date.
+
+    Returns:
+        date: The day, or None if the text is not a date.
+    """
+    try:
+        return datetime.strptime(date.strip(), FIXTURE_DATE_FORMAT).date()
+    except (AttributeError, ValueError):
+        return None
+
+def days_to_fixture(dates, today):
+    """
+    Returns the distance in days to the team's closest fixture that is upcoming or played yesterday.
+
+    Args:
+        dates (list): The team's fixture dates as stored.
+        today (date): The current day.
+
+    Returns:
+        int: Days until that fixture (-1 for yesterday), or None if there is none.
+    """
+    days = [(day - today).days for day in map(fixture_day, dates) if day is not None]
+    days = [delta for delta in days if delta >= -1]
+    return min(days) if days else None
+
+def team_factor(fixture_days, read_age):
+    """
+    How much fresher than usual a team's data should be kept.
+
+    Args:
+        fixture_days (int): Days to the closest fixture, or None.
+        read_age (timedelta): Time since the team was last read, or None if never.
+
+    Returns:
+        float: Multiplier for the dataset intervals, below 1 for fresher data.
+    """
+    if fixture_days is not None and fixture_days <= 0:
+        return MATCHDAY_FRESHNESS / DEFAULT_FRESHNESS
+    if fixture_days is not None and fixture_days <= NEAR_FIXTURE_DAYS:
+        target = NEAR_FIXTURE_FRESHNESS
+    else:
+        target = DEFAULT_FRESHNESS
+    if read_age is not None and read_age <= RECENT_READ:
+        return min(target, RECENT_READ_FRESHNESS) / DEFAULT_FRESHNESS
+    # Idle teams are only relaxed away from fixtures
+    if (read_age is None or read_age >= IDLE_READ) and fixture_days is None:
+        return IDLE_FACTOR * target / DEFAULT_FRESHNESS
+    return target / DEFAULT_FRESHNESS
+
+def target_freshness(dataset, interval, factor):
+    """
+    How fresh a dataset of a team should be.
+
+    Args:
+        dataset (str): Dataset name.
+        interval (timedelta): The dataset's adaptive interval.
+        factor (float): The team_factor.
+
+    Returns:
+        timedelta: The maximum age before the job is due, within the dataset's bounds.
+    """
+    bounds = DATASET_INTERVALS[dataset]
+    return min(max(interval * factor, bounds.minimum), bounds.maximum * IDLE_FACTOR)
+
+def adapt_interval(dataset, interval, changed):
+    """
+    Backs off an interval after an unchanged scrape and tightens it after a changed one.
+
+    Args:
+        dataset (str): Dataset name.
+        interval (timedelta): The current interval.
+        changed (bool): Whether the scrape differed from the stored data.
+
+    Returns:
+        timedelta: The new interval, within the dataset's bounds.
+    """
+    bounds = DATASET_INTERVALS[dataset]
+    interval = interval * (TIGHTEN if changed else BACKOFF)
+    return min(max(interval, bounds.minimum), bounds.maximum)
+
+class RefreshScheduler:
+    """
+    Priority queue of per-dataset refresh jobs, drained within a global budget by a bounded worker pool.
+    """
+
+    def __init__(self, budget=BUDGET, window=BUDGET_WINDOW, workers=WORKERS):
+        self.budget = budget
+        self.window = window
+        self.workers = workers
+        self.handlers = {}
+        self.queue = []
+        self._queued_at = time.monotonic()
+        self._started = deque()
+        self._reads = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._closed = False
+        # Teams submitted to the pool and not finished, and how many of them are running
+        self._busy = set()
+        self.running = 0
+        # Rounds only run while this process holds the lease, if one is set
+        self.lease = None
+        self.refreshed = Counter()
+        self.unchanged = Counter()
+        self.failed = Counter()
+        self.deferred = 0
+        self.skipped_busy = 0
+
+    def handler(self, dataset):
+        """
+        Registers the coroutine function refreshing one dataset of a team.
+
+        The handler is called as `handler(db, team)` with a fresh session and
+        the models.Team. It returns the sync_rows summary, or None if nothing
+        was scraped.
+
+        Args:
+            dataset (str): Dataset name, one of DATASET_INTERVALS.
+
+        Returns:
+            callable: The decorator.
+        """
+        def decorator(func):
+            self.handlers[dataset] = func
+            return func
+        return decorator
+
+    def record_read(self, db, team_id):
+        """
+        Notes that a team's data was requested, so it is kept fresher.
+
+        Args:
+            db (Session): Database session.
+            team_id (int): The team read.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._reads.get(team_id, -READ_WRITE_INTERVAL) < READ_WRITE_INTERVAL:
+                return
+            self._reads[team_id] = now
+        try:
+            row = db.query(models.TeamRead).filter(models.TeamRead.team_id == team_id).first()
+            if row is None:
+                row = models.TeamRead(team_id=team_id)
+                db.add(row)
+            row.read_at = datetime.utcnow()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error recording team read: {e}")
+
+    def prioritize(self, db, now=None):
+        """
+        Ranks every dataset of every team by how overdue it is.
+
+        Args:
+            db (Session): Database session.
+            now (datetime): The current UTC time.
+
+        Returns:
+            list: RefreshTask tuples of the due jobs, as a heap (most overdue first).
+        """
+        now = now or datetime.utcnow()
+        states = {(state.team_id, state.dataset): state for state in db.query(models.RefreshState)}
+        # Datasets checked before per-dataset jobs existed start from their fingerprint
+        checked = {(team_id, dataset): checked_at for team_id, dataset, checked_at in db.query(
+            models.DatasetFingerprint.team_id, models.DatasetFingerprint.dataset, models.DatasetFingerprint.checked_at)}
+        reads = dict(db.query(models.TeamRead.team_id, models.TeamRead.read_at))
+        fixtures = {}
+        for team_id, date in db.query(models.MatchFixtures.team_id, models.MatchFixtures.date):
+            fixtures.setdefault(team_id, []).append(date)
+        queue = []
+        for team_id, team_name in db.query(models.Team.id, models.Team.team_name):
+            read_at = reads.get(team_id)
+            factor = team_factor(
+                days_to_fixture(fixtures.get(team_id, []), now.date()),
+                now - read_at if read_at else None,
+            )
+            for dataset in self.handlers:
+                state = states.get((team_id, dataset))
+                interval = timedelta(seconds=state.interval) if state and state.interval else DATASET_INTERVALS[dataset].initial
+                # A failed refresh counts as checked, so it is not retried every tick
+                last = (state.last_attempt_at if state else None) or checked.get((team_id, dataset))
+                target = target_freshness(dataset, interval, factor)
+                staleness = now - last if last else None
+                priority = staleness / target if staleness is not None else float('inf')
+                if priority >= 1:
+                    heapq.heappush(queue, (-priority, team_id, dataset, RefreshTask(priority, team_id, team_name, dataset, staleness, target)))
+        return queue
+
+    def _take_budget(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._started and now - self._started[0] > self.window:
+                self._started.popleft()
+            if len(self._started) >= self.budget:
+                return False
+            self._started.append(now)
+            return True
+
+    def due(self):
+        """
+        Rebuilds the queue and pops the jobs to run now, grouped by team.
+
+        Jobs of teams still refreshing are left in the queue, and popping
+        stops when the budget is spent or the pool already has a job
+        waiting per worker.
+
+        Returns:
+            list: Lists of RefreshTask tuples, one per team, most overdue first.
+        """
+        db = SessionLocal()
+        try:
+            queue = self.prioritize(db)
+        finally:
+            db.close()
+        teams, left = {}, []
+        while queue:
+            entry = heapq.heappop(queue)
+            task = entry[-1]
+            with self._lock:
+                busy = task.team_id in self._busy
+                full = len(self._busy) - self.running + len(teams) >= self.workers
+            if busy:
+                self.skipped_busy += 1
+                left.append(entry)
+            elif task.team_id not in teams and full:
+                left.append(entry)
+                break
+            elif self._take_budget():
+                teams.setdefault(task.team_id, []).append(task)
+            else:
+                left.append(entry)
+                break
+        left.extend(queue)
+        with self._lock:
+            self.queue = [entry[-1] for entry in sorted(left)]
+            self._queued_at = time.monotonic()
+            self.deferred += len(left)
+        return list(teams.values())
+
+    def record(self, db, task, change):
+        """
+        Stores the outcome of a job and adapts its interval.
+
+        Args:
+            db (Session): Database session.
+            task (RefreshTask): The job.
+            change (dict): The sync_rows summary, or None if the refresh failed.
+        """
+        now = datetime.utcnow()
+        state = db.query(models.RefreshState).filter(
+            models.RefreshState.team_id == task.team_id,
+            models.RefreshState.dataset == task.dataset
+        ).first()
+        if state is None:
+            state = models.RefreshState(
+                team_id=task.team_id,
+                dataset=task.dataset,
+                interval=int(DATASET_INTERVALS[task.dataset].initial.total_seconds()),
+                failures=0,
+            )
+            db.add(state)
+        state.last_attempt_at = now
+        if change is None:
+            state.failures = (state.failures or 0) + 1
+            self.failed[task.dataset] += 1
+        else:
+            changed = not change['skipped']
+            state.interval = int(adapt_interval(task.dataset, timedelta(seconds=state.interval), changed).total_seconds())
+            state.last_success_at = now
+            state.failures = 0
+            if changed:
+                state.last_changed_at = now
+            else:
+                self.unchanged[task.dataset] += 1
+            self.refreshed[task.dataset] += 1
+        db.commit()
+
+    async def run_team(self, db, tasks):
+        """
+        Runs the due jobs of one team one after the other on a single session.
+
+        Args:
+            db (Session): The team job's session.
+            tasks (list): RefreshTask tuples of the team.
+        """
+        for task in tasks:
+            change = None
+            try:
+                team = db.get(models.Team, task.team_id)
+                if team is not None:
+                    change = await self.handlers[task.dataset](db, team)
+            except Exception as e:
+                db.rollback()
+                print(f"Error refreshing {task.dataset} of {task.team_name}: {e}")
+            if change is None:
+                print(f"{task.team_name} {task.dataset}: refresh failed")
+            elif change['skipped']:
+                print(f"{task.team_name} {task.dataset}: unchanged, skipped")
+            else:
+                print(f"{task.team_name} {task.dataset}: {change['inserted']} inserted, {change['updated']} updated, {change['deleted']} deleted")
+            try:
+                self.record(db, task, change)
+            except Exception as e:
+                db.rollback()
+                print(f"Error recording refresh of {task.team_name} {task.dataset}: {e}")
+
+    def _work(self, tasks):
+        team_id = tasks[0].team_id
+        with self._lock:
+            self.running += 1
+        db = SessionLocal()
+        try:
+            asyncio.run(self.run_team(db, tasks))
+        except Exception as e:
+            print(f"Error refreshing team {tasks[0].team_name}: {e}")
+        finally:
+            db.close()
+            with self._lock:
+                self.running -= 1
+                self._busy.discard(team_id)
+
+    def submit(self, tasks):
+        """
+        Hands a team's jobs to the worker pool.
+
+        Args:
+            tasks (list): RefreshTask tuples of one team.
+
+        Returns:
+            bool: False if the scheduler is shut down.
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="refresh")
+            self._busy.add(tasks[0].team_id)
+            self._executor.submit(self._work, tasks)
+            return True
+
+    def tick(self):
+        """
+        Runs one scheduling round; called by the background scheduler every TICK_SECONDS.
+
+        Returns as soon as the due jobs are handed to the pool, so rounds do
+        not overlap however long the refreshes take.
+        """
+        if not self.handlers or self._closed:
+            return
+        if self.lease is not None and not self.lease.is_leader:
+            return
+        for tasks in self.due():
+            if not self.submit(tasks):
+                return
+            print(f"Refreshing {tasks[0].team_name}: " + ", ".join(
+                f"{task.dataset} ({'never refreshed' if task.staleness is None else f'{task.priority:.1f}x overdue'})" for task in tasks))
+
+    def shutdown(self, wait=True):
+        """
+        Stops taking jobs, drops the team jobs not started yet and waits for the running ones.
+
+        Dropped jobs are not lost: they are still due and queued again by the
+        next process.
+
+        Args:
+            wait (bool): Whether to wait for running jobs.
+        """
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+        with self._lock:
+            self._busy.clear()
+
+    def lag(self):
+        """
+        Returns how far the most overdue queued job is past its target freshness.
+
+        Jobs never refreshed have no staleness and are left out.
+
+        Returns:
+            float: Seconds, 0 when no refreshed job is waiting.
+        """
+        with self._lock:
+            overdue = [task.staleness - task.target for task in self.queue if task.staleness is not None]
+            waited = time.monotonic() - self._queued_at
+        return max(max(overdue).total_seconds() + waited, 0) if overdue else 0
+
+    def metrics(self):
+        """
+        Returns the scheduler counters.
+
+        Returns:
+            dict: Whether this process runs rounds, team jobs running and waiting in the pool, due jobs left queued and the
+                lag of the most overdue one, budget used in the window, and refreshes, unchanged results and failures per dataset.
+        """
+        lag = self.lag()
+        with self._lock:
+            return {
+                'leader': self.lease.is_leader if self.lease is not None else True,
+                'workers': self.workers,
+                'running': self.running,
+                'waiting': len(self._busy) - self.running,
+                'skipped_busy': self.skipped_busy,
+                'queued': len(self.queue),
+                'lag_seconds': round(lag, 1),
+                'budget': self.budget,
+                'budget_used': len(self._started),
+                'deferred': self.deferred,
+                'refreshed': dict(self.refreshed),
+                'unchanged': dict(self.unchanged),
+                'failed': dict(self.failed),
+            }
+
+refresh_scheduler = RefreshScheduler()
+
+# Gauges of the scheduler's live state, set from metrics() on every /metrics render
+SCHEDULER_GAUGES = {
+    key: telemetry.registry.register(telemetry.Gauge(f"scheduler_{key}", documentation))
+    for key, documentation in (
+        ('leader', 'Whether this process holds the scheduler lease.'),
+        ('workers', 'Size of the refresh worker pool.'),
+        ('running', 'Team refreshes running.'),
+        ('waiting', 'Team refreshes waiting for a worker.'),
+        ('queued', 'Due dataset refreshes left in the queue.'),
+        ('lag_seconds', 'How far the most overdue queued refresh is past its target freshness.'),
+        ('budget', 'Dataset refreshes allowed per budget window.'),
+        ('budget_used', 'Dataset refreshes started in the current budget window.'),
+    )
+}
+SCHEDULER_REFRESHES = telemetry.registry.register(telemetry.Gauge(
+    'scheduler_refreshes', 'Dataset refreshes since start by outcome: refreshed, unchanged or failed.', ('dataset', 'outcome')))
+
+@telemetry.registry.collector
+def collect_scheduler_metrics():
+    """
+    Copies the scheduler's metrics into its gauges.
+    """
+    metrics = refresh_scheduler.metrics()
+    for key, gauge in SCHEDULER_GAUGES.items():
+        gauge.set(float(metrics[key]))
+    for outcome in ('refreshed', 'unchanged', 'failed'):
+        for dataset, count in metrics[outcome].items():
+            SCHEDULER_REFRESHES.set(count, dataset=dataset, outcome=outcome)
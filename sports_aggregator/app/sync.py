@@ -0,0 +1,203 @@
+"""
+Incremental writes of scraped team data.
+
+Rows are identified by natural keys: (team_id, date, home, away) for
+fixtures, (team_id, tournament) for stats, (team_id, name) for squads and
+(team_name, link) for news. Writes are bulk `INSERT ... ON CONFLICT DO UPDATE`
+statements on the unique indexes over those keys, so storing the same
+scrape twice never duplicates rows.
+
+For the scheduled team refresh each scraped dataset is also fingerprinted.
+When a fresh scrape hashes the same as the stored fingerprint the database
+is left alone; otherwise only new and changed rows are upserted and stored
+rows missing from the scrape are deleted.
+"""
+#pylint: disable=  trailing-whitespace,line-too-long,import-error
+import json
+import hashlib
+from datetime import datetime
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert
+from db_model.models import models
+from repository import telemetry
+
+FIXTURE_FIELDS = ('league', 'date', 'home', 'result', 'away')
+STATS_FIELDS = ('tournament', 'apps', 'goals', 'shots_pg', 'poss', 'passes', 'rating')
+PLAYER_FIELDS = ('name', 'img', 'dob', 'nat', 'market_value')
+NEWS_FIELDS = ('team_name', 'news_img', 'news_link', 'news_title')
+
+# Model, stored fields and natural key of each dataset
+DATASETS = {
+    'fixtures': (models.MatchFixtures, FIXTURE_FIELDS, ('team_id', 'date', 'home', 'away')),
+    'stats': (models.TeamStats, STATS_FIELDS, ('team_id', 'tournament')),
+    'players': (models.TeamPlayers, PLAYER_FIELDS, ('team_id', 'name')),
+    'news': (models.Team_News, NEWS_FIELDS, ('team_name', 'news_link')),
+}
+
+# Rows per statement, well below SQLite's limit on bound parameters
+UPSERT_CHUNK = 500
+
+def fingerprint(items, fields):
+    """
+    Hashes a scraped dataset independently of row order.
+
+    Args:
+        items (list): Scraped rows as dictionaries.
+        fields (tuple): The columns that make up a row.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    rows = sorted(json.dumps([item.get(field) for field in fields], default=str) for item in items)
+    return hashlib.sha256("\n".join(rows).encode("utf-8")).hexdigest()
+
+def keyed_rows(dataset: str, items, **columns):
+    """
+    Builds the rows of a dataset keyed by their natural key.
+
+    Rows without a complete key, such as news without a link, are dropped;
+    of rows sharing a key the last one wins.
+
+    Args:
+        dataset (str): Dataset name, one of DATASETS.
+        items (list): Scraped rows as dictionaries.
+        **columns: Values added to every row, e.g. team_id.
+
+    Returns:
+        dict: Natural key tuple to row dictionary.
+    """
+    _, fields, keys = DATASETS[dataset]
+    rows = {}
+    for item in items:
+        row = {**{field: item.get(field) for field in fields}, **columns}
+        key = tuple(row[column] for column in keys)
+        if all(value not in (None, '') for value in key):
+            rows[key] = row
+    return rows
+
+def upsert_rows(db: Session, dataset: str, rows):
+    """
+    Inserts rows, updating those whose natural key is already stored, in bulk.
+
+    Args:
+        db (Session): Database session; the caller commits.
+        dataset (str): Dataset name, one of DATASETS.
+        rows (list): Complete rows as dictionaries.
+
+    Returns:
+        int: The number of rows written.
+    """
+    model, _, keys = DATASETS[dataset]
+    # The conflict target must repeat the condition of a partial unique index
+    index = next(index for index in model.__table__.indexes if index.unique)
+    where = index.dialect_options['sqlite']['where']
+    for start in range(0, len(rows), UPSERT_CHUNK):
+        statement = insert(model).values(rows[start:start + UPSERT_CHUNK])
+        statement = statement.on_conflict_do_update(
+            index_elements=list(keys),
+            index_where=where,
+            set_={column: statement.excluded[column] for column in rows[0] if column not in keys},
+        )
+        db.execute(statement)
+    return len(rows)
+
+def save_rows(db: Session, dataset: str, items, **columns):
+    """
+    Upserts scraped rows and returns them as stored, without deleting anything.
+
+    Args:
+        db (Session): Database session.
+        dataset (str): Dataset name, one of DATASETS.
+        items (list): Scraped rows as dictionaries.
+        **columns: Values added to every row, e.g. team_id.
+
+    Returns:
+        list: The stored model instances of the scraped rows.
+    """
+    model, _, keys = DATASETS[dataset]
+    rows = keyed_rows(dataset, items, **columns)
+    upsert_rows(db, dataset, list(rows.values()))
+    telemetry.commit(db, dataset)
+    telemetry.count_rows(dataset, 'upserted', len(rows))
+    query = db.query(model)
+    for column, value in columns.items():
+        query = query.filter(getattr(model, column) == value)
+    return [row for row in query.all() if tuple(getattr(row, column) for column in keys) in rows]
+
+def sync_rows(db: Session, team_id: int, dataset: str, items, existing, columns=None):
+    """
+    Writes a freshly scraped dataset only if it differs from the stored one.
+
+    Args:
+        db (Session): Database session.
+        team_id (int): The team the dataset belongs to.
+        dataset (str): Dataset name, one of DATASETS.
+        items (list): Scraped rows as dictionaries.
+        existing (Query): Query for the currently stored rows of the dataset.
+        columns (dict): Values added to every scraped row, e.g. team_id.
+
+    Returns:
+        dict: {'skipped': bool, 'inserted': int, 'updated': int, 'deleted': int}
+    """
+    model, fields, keys = DATASETS[dataset]
+    now = datetime.utcnow()
+    digest = fingerprint(items, fields)
+    mark = db.query(models.DatasetFingerprint).filter(
+        models.DatasetFingerprint.team_id == team_id,
+        models.DatasetFingerprint.dataset == dataset
+    ).first()
+    if mark is None:
+        mark = models.DatasetFingerprint(team_id=team_id, dataset=dataset, skipped=0, written=0)
+        db.add(mark)
+    mark.checked_at = now
+
+    if mark.digest == digest:
+        mark.skipped = (mark.skipped or 0) + 1
+        telemetry.commit(db, dataset)
+        return {'skipped': True, 'inserted': 0, 'updated': 0, 'deleted': 0}
+
+    rows = keyed_rows(dataset, items, **(columns or {}))
+    stored, stale = {}, []
+    for row in existing.all():
+        key = tuple(getattr(row, column) for column in keys)
+        if key in rows and key not in stored:
+            stored[key] = row
+        else:
+            stale.append(row.id)
+    inserted = [row for key, row in rows.items() if key not in stored]
+    updated = [
+        row for key, row in rows.items()
+        if key in stored and any(str(row[field]) != str(getattr(stored[key], field)) for field in row)
+    ]
+    upsert_rows(db, dataset, inserted + updated)
+    if stale:
+        db.query(model).filter(model.id.in_(stale)).delete(synchronize_session=False)
+
+    mark.digest = digest
+    mark.written = (mark.written or 0) + len(inserted) + len(updated) + len(stale)
+    mark.changed_at = now
+    telemetry.commit(db, dataset)
+    telemetry.count_rows(dataset, 'inserted', len(inserted))
+    telemetry.count_rows(dataset, 'updated', len(updated))
+    telemetry.count_rows(dataset, 'deleted', len(stale))
+    return {'skipped': False, 'inserted': len(inserted), 'updated': len(updated), 'deleted': len(stale)}
+
+def sync_team_rows(db: Session, team, dataset: str, items):
+    """
+    Syncs one of a team's own datasets: 'fixtures', 'stats' or 'players'.
+
+    Args:
+        db (Session): Database session.
+        team (models.Team): The team.
+        dataset (str): Dataset name.
+        items (list): Scraped rows as dictionaries.
+
+    Returns:
+        dict: The sync_rows summary.
+    """
+    model = DATASETS[dataset][0]
+    return sync_rows(
+        db, team.id, dataset, items,
+        db.query(model).filter(model.team_id == team.id),
+        {'team_id': team.id}
+    )
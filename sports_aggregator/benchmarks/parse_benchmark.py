@@ -0,0 +1,73 @@
+"""
+Micro-benchmark comparing HTML parsers and SoupStrainer targeting on saved pages.
+
+Run from the sports_aggregator directory:
+
+    python -m benchmarks.parse_benchmark path/to/saved/pages --repeat 20
+
+Every *.html file in the directory is parsed whole and once per extractor
+strainer, with each available parser. Times are the median per parse.
+"""
+#pylint: disable=  trailing-whitespace,line-too-long,import-error
+import argparse
+import statistics
+import time
+from pathlib import Path
+from repository.parsing import parse, SERP_RESULTS_ONLY
+from scrapper import scrapper, scrapper_team
+
+STRAINERS = {
+    'serp': SERP_RESULTS_ONLY,
+    'fixtures': scrapper_team.FIXTURES_ONLY,
+    'team stats': scrapper_team.STATS_ONLY,
+    'team header': scrapper_team.TEAM_HEADER_ONLY,
+    'squad': scrapper_team.SQUAD_ONLY,
+    'articles': scrapper_team.ARTICLES_ONLY,
+    'infobox': scrapper.INFOBOX_ONLY,
+    'player stats': scrapper.PLAYER_STATS_ONLY,
+    'news menu': scrapper.NEWS_MENU_ONLY,
+}
+
+def available_parsers():
+    """
+    Returns the parser names BeautifulSoup can use in this environment.
+    """
+    parsers = ['html.parser']
+    try:
+        import lxml  # pylint: disable=unused-import,import-outside-toplevel
+        parsers.append('lxml')
+    except ImportError:
+        pass
+    return parsers
+
+def time_parse(html, strainer, parser, repeat):
+    """
+    Parses `html` `repeat` times and returns (median seconds, element count).
+    """
+    timings = []
+    soup = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        soup = parse(html, strainer, parser)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), len(soup.find_all(True))
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('pages', type=Path, help="Directory of saved .html pages")
+    arg_parser.add_argument('--repeat', type=int, default=10, help="Parses per measurement")
+    args = arg_parser.parse_args()
+
+    print(f"{'page':30} {'target':14} {'parser':12} {'ms':>9} {'elements':>9}")
+    for path in sorted(args.pages.glob('*.html')):
+        html = path.read_text(encoding='utf-8', errors='replace')
+        for parser in available_parsers():
+            seconds, count = time_parse(html, None, parser, args.repeat)
+            print(f"{path.name[:30]:30} {'whole page':14} {parser:12} {seconds * 1000:9.2f} {count:9}")
+            for target, strainer in STRAINERS.items():
+                seconds, count = time_parse(html, strainer, parser, args.repeat)
+                if count:
+                    print(f"{path.name[:30]:30} {target:14} {parser:12} {seconds * 1000:9.2f} {count:9}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+"""
+Offline benchmark of every finder and scraper against saved pages.
+
+Saved pages are served from a local HTTP server, and the fetcher is pointed
+at it through SCRAPER_LOCAL_ORIGIN, so the scrapers run their real HTTP,
+browser and parsing paths without touching WhoScored, Transfermarkt,
+Wikipedia, ESPN or Google. Pages come from a page archive recorded by the
+app (see repository/archive.py) or from a directory with a manifest.json
+mapping each URL to a saved .html file.
+
+Run from the sports_aggregator directory:
+
+    python -m benchmarks.scraper_benchmark --archive ../page_archive \\
+        --player "Cole Palmer" --team Chelsea --output bench.json
+
+Each function runs in a fresh process, so browser launches, caches and peak
+RSS are measured per function. Link caching, page archiving and the
+governor are disabled in the benchmark processes. Results are printed and,
+with --output, written as JSON for comparison across commits.
+"""
+#pylint: disable=  trailing-whitespace,line-too-long,import-error,broad-except,import-outside-toplevel
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+import threading
+import multiprocessing
+from pathlib import Path
+from collections import namedtuple
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+Case = namedtuple('Case', ['name', 'run', 'setup'], defaults=[None])
+Case.__doc__ = """
+One benchmarked function: `run(*setup())` is timed, `setup` prepares its
+arguments (e.g. resolves the link a scraper takes) and is not.
+"""
+
+def load_archive(root):
+    """
+    Reads the latest archived HTML of every URL in a page archive.
+
+    Args:
+        root (str): The archive directory.
+
+    Returns:
+        dict: URL to HTML.
+    """
+    from repository.archive import PageArchive
+    archive = PageArchive(root=str(root), record=False)
+    with open(os.path.join(root, "index.jsonl"), encoding="utf-8") as index:
+        urls = {json.loads(line)["url"] for line in index}
+    return {url: archive.lookup(url) for url in urls}
+
+def load_fixtures(root):
+    """
+    Reads saved pages listed in `root/manifest.json` as {"url": "file.html"}.
+
+    Args:
+        root (Path): The fixture directory.
+
+    Returns:
+        dict: URL to HTML.
+    """
+    manifest = json.loads((root / "manifest.json").read_text(encoding="utf-8"))
+    return {url: (root / name).read_text(encoding="utf-8", errors="replace") for url, name in manifest.items()}
+
+class FixtureServer:
+    """
+    Local HTTP server answering http://127.0.0.1:<port>/<host><path>?<query> with the saved page of https://<host><path>?<query>.
+    """
+
+    def __init__(self, pages):
+        self.pages = {self._key(url): html for url, html in pages.items()}
+        self.misses = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # pylint: disable=invalid-name
+                host, _, rest = self.path.lstrip('/').partition('/')
+                html = server.pages.get(server._key(f"https://{host}/{rest}"))
+                if html is None:
+                    server.misses.append(f"https://{host}/{rest}")
+                    self.send_error(404, "Not found in fixtures")
+                    return
+                body = html.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.origin = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    @staticmethod
+    def _key(url):
+        parts = urlsplit(url)
+        return (parts.hostname, parts.path or '/', parts.query)
+
+    def __enter__(self):
+        threading.Thread(target=self._httpd.serve_forever, name="fixture-server", daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+def build_cases(player, team):
+    """
+    Lists every finder and scraper with arguments for one player and one team.
+
+    Args:
+        player (str): Player name used by the player finders and scrapers.
+        team (str): Team name used by the team finders and scrapers.
+
+    Returns:
+        list: Case tuples.
+    """
+    import asyncio
+    from scrapper import search, finder, scrapper, scrapper_team
+
+    def uncached(func):
+        return getattr(func, 'uncached', func)
+
+    def team_link():
+        return (uncached(finder.find_team_link)(team),)
+
+    return [
+        Case('search.find_wikipedia_link', lambda: uncached(search.find_wikipedia_link)(player)),
+        Case('search.find_stat_link', lambda: uncached(search.find_stat_link)(player)),
+        Case('search.find_news_link', lambda: uncached(search.find_news_link)(player)),
+        Case('finder.find_team_link', lambda: uncached(finder.find_team_link)(team)),
+        Case('finder.team_player_link', lambda: uncached(finder.team_player_link)(team)),
+        Case('finder.team_news_link', lambda: uncached(finder.team_news_link)(team)),
+        Case('scrapper.scrape_player_name', lambda: scrapper.scrape_player_name(player)),
+        Case('scrapper.scrape_player_data', scrapper.scrape_player_data, lambda: (scrapper.scrape_player_name(player)[1],)),
+        Case('scrapper.scrape_player_stats', lambda: scrapper.scrape_player_stats(player)),
+        Case('scrapper.scrape_player_news', lambda: scrapper.scrape_player_news(player)),
+        Case('scrapper.find_articles', lambda: scrapper.find_articles(player)),
+        Case('scrapper_team.fetch_team_page', scrapper_team.fetch_team_page, team_link),
+        Case('scrapper_team.scrape_fixtures', scrapper_team.scrape_fixtures, team_link),
+        Case('scrapper_team.scrape_stats', scrapper_team.scrape_stats, team_link),
+        Case('scrapper_team.scrape_name_image', scrapper_team.scrape_name_image, team_link),
+        Case('scrapper_team.scrape_players', scrapper_team.scrape_players, lambda: (uncached(finder.team_player_link)(team),)),
+        Case('scrapper_team.scrape_news', lambda link: asyncio.run(scrapper_team.scrape_news(link)), lambda: (uncached(finder.team_news_link)(team),)),
+    ]
+
+def describe_result(result):
+    """
+    Summarizes a function result for the report.
+    """
+    if result is None:
+        return None
+    if isinstance(result, (list, tuple, dict)):
+        return f"{type(result).__name__}[{len(result)}]"
+    return str(result)[:80]
+
+def run_case(name, player, team, repeat, results):
+    """
+    Runs one case in the current (fresh) process and puts its measurements on `results`.
+    """
+    from repository.browser import driver_pool
+    from repository.parsing import parse_stats
+    from repository.snapshots import snapshot_cache
+    from repository.governor import governor, DomainLimit
+
+    governor.limits = {}
+    governor.default = DomainLimit(rate=1e6, burst=1e6, max_in_flight=1_000_000)
+    case = {case.name: case for case in build_cases(player, team)}[name]
+    report = {'function': name, 'error': None}
+    try:
+        args = case.setup() if case.setup else ()
+        walls, result = [], None
+        parse_stats.update(calls=0, seconds=0.0)
+        driver_pool.launches, driver_pool.launch_seconds = 0, 0.0
+        # Every repetition fetches again instead of reading the snapshot cache
+        snapshot_cache.max_entries = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = case.run(*args)
+            walls.append(time.perf_counter() - started)
+        report.update(
+            wall_ms=round(statistics.median(walls) * 1000, 1),
+            browser_launches=driver_pool.launches,
+            browser_launch_ms=round(driver_pool.launch_seconds * 1000 / repeat, 1),
+            parse_calls=parse_stats['calls'] // repeat,
+            parse_ms=round(parse_stats['seconds'] * 1000 / repeat, 1),
+            result=describe_result(result),
+        )
+    except Exception as e:
+        report['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        driver_pool.close()
+    # ru_maxrss is in kilobytes on Linux; browsers count once reaped as children
+    report['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    report['peak_child_rss_mb'] = round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1)
+    results.put(report)
+
+def git_commit():
+    """
+    Returns the current commit hash, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = arg_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--archive', type=Path, help="Page archive directory to serve")
+    source.add_argument('--fixtures', type=Path, help="Directory with manifest.json and saved .html pages")
+    arg_parser.add_argument('--player', default="Cole Palmer", help="Player name for the player functions")
+    arg_parser.add_argument('--team', default="Chelsea", help="Team name for the team functions")
+    arg_parser.add_argument('--only', action='append', help="Run only functions containing this text; repeatable")
+    arg_parser.add_argument('--repeat', type=int, default=1, help="Timed runs per function")
+    arg_parser.add_argument('--timeout', type=float, default=300, help="Seconds before a function's process is killed")
+    arg_parser.add_argument('--output', type=Path, help="Write the results as JSON to this file")
+    args = arg_parser.parse_args()
+
+    pages = load_archive(args.archive) if args.archive else load_fixtures(args.fixtures)
+    names = [case.name for case in build_cases(args.player, args.team)]
+    if args.only:
+        names = [name for name in names if any(text in name for text in args.only)]
+
+    reports = []
+    with FixtureServer(pages) as server:
+        os.environ.update(
+            SCRAPER_LOCAL_ORIGIN=server.origin,
+            SCRAPER_LINK_CACHE="0",
+            SCRAPER_ARCHIVE="0",
+            SCRAPER_REPLAY="0",
+        )
+        context = multiprocessing.get_context('spawn')
+        print(f"Serving {len(pages)} saved pages at {server.origin}")
+        print(f"{'function':34} {'wall ms':>9} {'launch ms':>10} {'parse ms':>9} {'rss MB':>8} {'child MB':>9}  result")
+        for name in names:
+            results = context.Queue()
+            process = context.Process(target=run_case, args=(name, args.player, args.team, args.repeat, results))
+            process.start()
+            try:
+                report = results.get(timeout=args.timeout)
+            except Exception:
+                process.kill()
+                report = {'function': name, 'error': f"timed out after {args.timeout}s"}
+            process.join()
+            reports.append(report)
+            if report['error']:
+                print(f"{name:34} error: {report['error']}")
+            else:
+                print(f"{name:34} {report['wall_ms']:9.1f} {report['browser_launch_ms']:10.1f} {report['parse_ms']:9.1f} "
+                      f"{report['peak_rss_mb']:8.1f} {report['peak_child_rss_mb']:9.1f}  {report['result']}")
+        missing = sorted(set(server.misses))
+
+    if missing:
+        print(f"{len(missing)} requested page(s) were not in the fixtures, e.g. {missing[0]}")
+    if args.output:
+        args.output.write_text(json.dumps({
+            'commit': git_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'player': args.player,
+            'team': args.team,
+            'repeat': args.repeat,
+            'pages': len(pages),
+            'missing_pages': missing,
+            'results': reports,
+        }, indent=2), encoding="utf-8")
+        print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Schema migrations for databases created before a model change.
+
+`Base.metadata.create_all` creates missing tables but never touches existing
+ones, so columns and indexes added to existing tables are created here.
+Before a unique index on a natural key is created, duplicate rows are
+removed, keeping the most recently inserted row of each key.
+
+Run by the startup handler in app/main.py, or by hand from the sports_aggregator directory:
+
+    python -m db_model.database.migrations
+"""
+#pylint: disable=  trailing-whitespace,line-too-long,import-error
+from sqlalchemy import text
+from db_model.database.database import engine
+from db_model.models import models
+
+# Models whose unique indexes enforce natural keys
+NATURAL_KEY_MODELS = (models.MatchFixtures, models.TeamStats, models.TeamPlayers, models.Team_News)
+
+# Indexes replaced by a different key; news was first keyed on the link alone, which teams share
+RETIRED_INDEXES = ('uq_team_news_link',)
+
+# Columns added to existing tables, as (model, column name)
+ADDED_COLUMNS = ((models.ScrapeJob, 'owner'), (models.ScrapeJob, 'heartbeat_at'))
+
+def add_column(connection, model, name):
+    """
+    Adds a model's column to its table if the table lacks it.
+
+    Args:
+        connection (Connection): Open connection in a transaction.
+        model (Base): The model.
+        name (str): The column name.
+
+    Returns:
+        bool: True if the column was added.
+    """
+    table = model.__tablename__
+    columns = {row[1] for row in connection.execute(text(f'PRAGMA table_info("{table}")'))}
+    if name in columns:
+        return False
+    column = model.__table__.columns[name]
+    connection.execute(text(f'ALTER TABLE "{table}" ADD COLUMN "{name}" {column.type.compile(connection.dialect)}'))
+    return True
+
+def dedupe(connection, index):
+    """
+    Deletes rows repeating the key of a unique index, keeping the highest id.
+
+    Rows with a NULL key column, or outside a partial index, are left alone
+    as the index does not cover them.
+
+    Args:
+        connection (Connection): Open connection in a transaction.
+        index (Index): The unique index about to be created.
+
+    Returns:
+        int: The number of rows deleted.
+    """
+    table = index.table.name
+    columns = ", ".join(f'"{column.name}"' for column in index.columns)
+    conditions = [f'"{column.name}" IS NOT NULL' for column in index.columns]
+    where = index.dialect_options['sqlite']['where']
+    if where is not None:
+        conditions.append(str(where))
+    covered = " AND ".join(conditions)
+    result = connection.execute(text(
+        f'DELETE FROM "{table}" WHERE {covered} AND id NOT IN '
+        f'(SELECT MAX(id) FROM "{table}" WHERE {covered} GROUP BY {columns})'
+    ))
+    return result.rowcount
+
+def migrate(bind=engine):
+    """
+    Adds new columns, drops retired indexes, removes duplicate rows and creates the natural key indexes that are missing.
+
+    Args:
+        bind (Engine): The database engine.
+    """
+    with bind.begin() as connection:
+        existing = {
+            row[0] for row in connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))
+        }
+        for model, name in ADDED_COLUMNS:
+            if add_column(connection, model, name):
+                print(f"Added {name} to {model.__tablename__}")
+        for name in RETIRED_INDEXES:
+            if name in existing:
+                connection.execute(text(f'DROP INDEX "{name}"'))
+                print(f"Dropped retired index {name}")
+        for model in NATURAL_KEY_MODELS:
+            for index in model.__table__.indexes:
+                if not index.unique or index.name in existing:
+                    continue
+                removed = dedupe(connection, index)
+                index.create(connection)
+                print(f"Created {index.name} on {model.__tablename__}, removing {removed} duplicate rows")
+
+if __name__ == '__main__':
+    models.Base.metadata.create_all(engine)
+    migrate()
@@ -2,7 +2,7 @@
 Module defining SQLAlchemy models for the application.
 """
 #pylint: disable=  unused-import,trailing-whitespace,line-too-long
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Text, Index, text
 from sqlalchemy.orm import relationship
 from db_model.database.database import Base
 
@@ -104,6 +104,7 @@ class Team(Base):
 class MatchFixtures(Base):
     """MatchFixtures model representing upcoming fixtures."""
     __tablename__ = 'fixtures'
+    __table_args__ = (Index('uq_fixtures_natural_key', 'team_id', 'date', 'home', 'away', unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
     team_id = Column(Integer, ForeignKey('team.id'))
@@ -120,6 +121,7 @@ class MatchFixtures(Base):
 class TeamStats(Base):
     """TeamStats model representing team statistics."""
     __tablename__ = 'team_stats'
+    __table_args__ = (Index('uq_team_stats_natural_key', 'team_id', 'tournament', unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
     tournament = Column(String)
@@ -138,6 +140,7 @@ class TeamStats(Base):
 class TeamPlayers(Base):
     """TeamPlayers model representing players in a team."""
     __tablename__ = 'team_player'
+    __table_args__ = (Index('uq_team_player_natural_key', 'team_id', 'name', unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
@@ -154,9 +157,91 @@ class TeamPlayers(Base):
 class Team_News(Base):
     """Team_News model representing news related to teams."""
     __tablename__ = 'Team_news'
+    # Teams share articles, so a link is unique per team; news without a link has no key and is never upserted
+    __table_args__ = (
+        Index('uq_team_news_natural_key', 'team_name', 'news_link', unique=True, sqlite_where=text("news_link != ''")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     team_name = Column(String)
     news_img = Column(String)
     news_link = Column(String)
     news_title = Column(String)
+
+
+class ResolvedLink(Base):
+    """ResolvedLink model caching search results of the link finders."""
+    __tablename__ = 'resolved_links'
+
+    id = Column(Integer, primary_key=True, index=True)
+    resolver = Column(String, index=True)
+    name = Column(String, index=True)
+    link = Column(String)
+    found = Column(Boolean)
+    resolved_at = Column(DateTime)
+
+
+class DatasetFingerprint(Base):
+    """DatasetFingerprint model storing the content hash of a team's last scraped dataset."""
+    __tablename__ = 'dataset_fingerprints'
+
+    id = Column(Integer, primary_key=True, index=True)
+    team_id = Column(Integer, ForeignKey('team.id'), index=True)
+    dataset = Column(String)
+    digest = Column(String)
+    # Running totals: syncs skipped as unchanged, and rows inserted, updated or deleted by the others
+    skipped = Column(Integer, default=0)
+    written = Column(Integer, default=0)
+    checked_at = Column(DateTime)
+    changed_at = Column(DateTime)
+
+
+class ScrapeJob(Base):
+    """ScrapeJob model persisting background scrape jobs and their progress."""
+    __tablename__ = 'scrape_jobs'
+
+    id = Column(String, primary_key=True, index=True)
+    kind = Column(String, index=True)
+    params = Column(Text)
+    status = Column(String, index=True)
+    stages = Column(Text)
+    result = Column(Text)
+    error = Column(String)
+    created_at = Column(DateTime)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    # Process running the job and when it last reported alive, so only jobs of dead processes are requeued
+    owner = Column(String)
+    heartbeat_at = Column(DateTime)
+
+
+class ScrapeLock(Base):
+    """ScrapeLock model holding the cross-process lock of an entity being scraped."""
+    __tablename__ = 'scrape_locks'
+
+    key = Column(String, primary_key=True)
+    owner = Column(String)
+    acquired_at = Column(DateTime)
+    expires_at = Column(DateTime)
+
+
+class TeamRead(Base):
+    """TeamRead model recording when a team's data was last requested."""
+    __tablename__ = 'team_reads'
+
+    team_id = Column(Integer, ForeignKey('team.id'), primary_key=True)
+    read_at = Column(DateTime)
+
+
+class RefreshState(Base):
+    """RefreshState model holding the adaptive refresh interval and last success of one dataset of a team."""
+    __tablename__ = 'refresh_states'
+
+    id = Column(Integer, primary_key=True, index=True)
+    team_id = Column(Integer, ForeignKey('team.id'), index=True)
+    dataset = Column(String)
+    interval = Column(Integer)
+    last_success_at = Column(DateTime)
+    last_attempt_at = Column(DateTime)
+    last_changed_at = Column(DateTime)
+    failures = Column(Integer, default=0)
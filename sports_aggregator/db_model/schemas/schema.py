@@ -1,5 +1,6 @@
 #pylint: disable= trailing-whitespaces,line-too-long
-from typing import List
+from typing import Any, List, Optional
+from datetime import datetime
 from pydantic import BaseModel, ConfigDict
 
 class StatsBase(BaseModel):
@@ -125,6 +126,30 @@ class ShowPlayer(BaseModel):
     news: List[NewsBase]
     model_config = ConfigDict(from_attributes=True)
 
+class PlayerBatch(BaseModel):
+    """
+    Model for a batch of players to add.
+
+    Attributes:
+        names (List[str]): Player names, e.g. a whole squad.
+    """
+    names: List[str]
+
+class PlayerBatchResult(BaseModel):
+    """
+    Model for the outcome of one player of a batch, streamed as it finishes.
+
+    Attributes:
+        name (str): The name as requested.
+        status (str): 'created', 'exists', 'not_found' or 'failed'.
+        player (ShowPlayer): The stored player, if any.
+        error (str): The failure reason if it failed.
+    """
+    name: str
+    status: str
+    player: Optional[ShowPlayer] = None
+    error: Optional[str] = None
+
 class MatchFixtures(BaseModel):
     """
     Model for match fixtures.
@@ -228,3 +253,56 @@ class Team_News(BaseModel):
     news_link: str
     news_title: str
     model_config = ConfigDict(from_attributes=True)
+
+class JobStage(BaseModel):
+    """
+    Model for the progress of one stage of a scrape job.
+    
+    Attributes:
+        name (str): Stage name.
+        status (str): 'running', 'done' or 'failed'.
+        started_at (datetime): When the stage started.
+        finished_at (datetime): When the stage ended, if it has.
+    """
+    name: str
+    status: str
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class Job(BaseModel):
+    """
+    Model for a background scrape job.
+    
+    Attributes:
+        id (str): Job ID.
+        kind (str): Job type, e.g. 'add_team'.
+        status (str): 'queued', 'running', 'succeeded' or 'failed'.
+        stages (List[JobStage]): Progress per stage.
+        result (Any): The job's result once it succeeded.
+        error (str): The failure reason if it failed.
+        created_at (datetime): When the job was submitted.
+        started_at (datetime): When a worker picked it up.
+        finished_at (datetime): When it ended.
+    """
+    id: str
+    kind: str
+    status: str
+    stages: List[JobStage]
+    result: Any = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class JobAccepted(BaseModel):
+    """
+    Model returned when a scrape job is queued.
+    
+    Attributes:
+        job_id (str): Job ID.
+        status (str): Initial status, 'queued'.
+        status_url (str): Endpoint reporting the job's progress.
+    """
+    job_id: str
+    status: str
+    status_url: str
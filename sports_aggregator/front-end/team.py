@@ -5,6 +5,53 @@ import streamlit as st
 from conversion import get_base64_image, default_image_path
 
 BASE_URL = "https://sports-aggregator.onrender.com"
+JOB_POLL_INTERVAL = 2
+# Give up on a scrape job that has not finished after this many seconds
+JOB_MAX_WAIT = 600
+
+class JobFailed(Exception):
+    """
+    Raised when a scrape job queued by the API failed.
+
+    Attributes:
+        job_id (str): The job's ID.
+        error (str): The failure reason reported by the job.
+    """
+
+    def __init__(self, job_id, error):
+        super().__init__(f"Scrape job {job_id} failed: {error}")
+        self.job_id = job_id
+        self.error = error
+
+async def wait_for_job(session, response, max_wait=JOB_MAX_WAIT):
+    """
+    Poll a scrape job queued by a POST endpoint until it finishes.
+
+    Args:
+        session (aiohttp.ClientSession): The open client session.
+        response (aiohttp.ClientResponse): The 202 response carrying the job reference.
+        max_wait (float): Seconds to wait for the job to finish.
+
+    Returns:
+        The job's result.
+
+    Raises:
+        JobFailed: If the job failed.
+        asyncio.TimeoutError: If the job did not finish within `max_wait`.
+    """
+    job = await response.json()
+    deadline = asyncio.get_running_loop().time() + max_wait
+    while True:
+        async with session.get(f"{BASE_URL}{job['status_url']}") as status:
+            status.raise_for_status()
+            job_state = await status.json()
+        if job_state['status'] == 'succeeded':
+            return job_state['result']
+        if job_state['status'] == 'failed':
+            raise JobFailed(job['job_id'], job_state['error'])
+        if asyncio.get_running_loop().time() + JOB_POLL_INTERVAL > deadline:
+            raise asyncio.TimeoutError(f"Scrape job {job['job_id']} still {job_state['status']} after {max_wait}s")
+        await asyncio.sleep(JOB_POLL_INTERVAL)
 
 async def get_news(team_name: str):
     """
@@ -44,7 +91,7 @@ async def add_news(team_name: str):
     async with aiohttp.ClientSession() as session:
         async with session.post(f"{BASE_URL}/teams/news/{team_name}") as response:
             response.raise_for_status()
-            return await response.json()
+            return await wait_for_job(session, response)
 
 async def add_team(team_name: str):
     """
@@ -66,7 +113,7 @@ async def add_team(team_name: str):
         async with session.post(f"{BASE_URL}/teams/{team_name}",json=payload,headers=headers) as response:
             print("hi")
             response.raise_for_status()
-            return await response.json()
+            return await wait_for_job(session, response)
 
 async def get_team(team_name: str):
     """
@@ -108,7 +155,7 @@ async def add_fixtures(team_name: str, id: int):
     async with aiohttp.ClientSession() as session:
         async with session.post(f"{BASE_URL}/teams/fixtures/{id}/{team_name}") as response:
             response.raise_for_status()
-            return await response.json()
+            return await wait_for_job(session, response)
 
 async def add_stats(team_name: str, id: int):
     """
@@ -124,7 +171,7 @@ async def add_stats(team_name: str, id: int):
     async with aiohttp.ClientSession() as session:
         async with session.post(f"{BASE_URL}/teams/stats/{id}/{team_name}") as response:
             response.raise_for_status()
-            return await response.json()
+            return await wait_for_job(session, response)
 
 async def add_players(team_name: str, id: int):
     """
@@ -140,7 +187,7 @@ async def add_players(team_name: str, id: int):
     async with aiohttp.ClientSession() as session:
         async with session.post(f"{BASE_URL}/teams/players/{id}/{team_name}") as response:
             response.raise_for_status()
-            return await response.json()
+            return await wait_for_job(session, response)
 
 async def display_team_news(team_news, team_name):
     """
@@ -207,6 +254,8 @@ async def display_team_news(team_news, team_name):
                         </div>
                         """, unsafe_allow_html=True)
                     col.append(col.pop(0))
+    except JobFailed as e:
+        st.error(f"Scraping the team news failed: {e.error}")
     except Exception as e:
         st.error(f"An error occurred while displaying team news: {e}")
 
@@ -294,6 +343,8 @@ async def display_team_data(team_info, team_name):
 
     except asyncio.TimeoutError:
         st.error("Timeout occurred while fetching data.")
+    except JobFailed as e:
+        st.error(f"Scraping the team failed: {e.error}")
     except aiohttp.ClientError as e:
         st.error(f"HTTP Error: {e}")
     except Exception as e:
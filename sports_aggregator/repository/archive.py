@@ -0,0 +1,185 @@
+# repository/archive.py
+#pylint: disable= trailing-whitespace,line-too-long,broad-except
+"""
+Content-addressed, compressed archive of every page the scrapers fetch.
+
+Each page body is stored once under its SHA-256, compressed with zstd when the
+zstandard package is installed and with gzip otherwise. An append-only index
+records the URL, fetch time, source ('http' or 'browser') and digest of every
+fetch. In replay mode pages are served from the archive instead of the
+network, so extractors can be re-run after a selector fix and scraper
+benchmarks can run offline and repeatably.
+
+Settings:
+    SCRAPER_ARCHIVE_DIR: archive location, default ../page_archive
+    SCRAPER_ARCHIVE: set to 0 to stop recording fetched pages
+    SCRAPER_REPLAY: set to 1 to serve pages from the archive only
+"""
+import os
+import gzip
+import json
+import hashlib
+import threading
+from datetime import datetime, timezone
+from contextlib import contextmanager
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_DIR = os.getenv("SCRAPER_ARCHIVE_DIR", "../page_archive")
+
+class PageNotArchived(LookupError):
+    """Raised in replay mode when a URL has never been archived."""
+
+class PageArchive:
+    """
+    Stores fetched pages by content hash and looks them up by URL.
+    """
+
+    def __init__(self, root=ARCHIVE_DIR, record=True, replay=False):
+        self.root = root
+        self.record = record
+        self.replay = replay
+        self._lock = threading.Lock()
+        self._latest = None
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.root, "index.jsonl")
+
+    def _object_path(self, digest, codec):
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.html.{codec}")
+
+    def _load_index(self):
+        if self._latest is None:
+            self._latest = {}
+            if os.path.exists(self._index_path):
+                with open(self._index_path, encoding="utf-8") as index:
+                    for line in index:
+                        entry = json.loads(line)
+                        self._latest[entry["url"]] = entry
+        return self._latest
+
+    @staticmethod
+    def _compress(data):
+        if zstandard is not None:
+            return "zst", zstandard.ZstdCompressor(level=10).compress(data)
+        return "gz", gzip.compress(data, compresslevel=6)
+
+    @staticmethod
+    def _decompress(codec, data):
+        if codec == "zst":
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read this archive entry")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def store(self, url, html, source):
+        """
+        Records a fetched page. Bodies already in the archive are not written again.
+
+        Args:
+            url (str): The page URL.
+            html (str): The page source.
+            source (str): How the page was fetched, 'http' or 'browser'.
+
+        Returns:
+            str: The SHA-256 digest of the page.
+        """
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        entry = {
+            "url": url,
+            "sha256": digest,
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+            "source": source,
+        }
+        with self._lock:
+            latest = self._load_index()
+            existing = [path for path in (self._object_path(digest, codec) for codec in ("zst", "gz")) if os.path.exists(path)]
+            if existing:
+                entry["codec"] = existing[0].rsplit(".", 1)[1]
+            else:
+                codec, blob = self._compress(data)
+                path = self._object_path(digest, codec)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(f"{path}.tmp", "wb") as obj:
+                    obj.write(blob)
+                os.replace(f"{path}.tmp", path)
+                entry["codec"] = codec
+            with open(self._index_path, "a", encoding="utf-8") as index:
+                index.write(json.dumps(entry) + "\n")
+            latest[url] = entry
+        return digest
+
+    def entry(self, url):
+        """
+        Returns the index entry of the latest archived fetch of a URL, or None.
+
+        Args:
+            url (str): The page URL.
+
+        Returns:
+            dict: The index entry.
+        """
+        with self._lock:
+            return self._load_index().get(url)
+
+    def lookup(self, url):
+        """
+        Returns the latest archived HTML of a URL.
+
+        Args:
+            url (str): The page URL.
+
+        Raises:
+            PageNotArchived: If the URL is not in the archive.
+
+        Returns:
+            str: The page source.
+        """
+        entry = self.entry(url)
+        if entry is None:
+            raise PageNotArchived(f"{url} is not in the page archive")
+        with open(self._object_path(entry["sha256"], entry["codec"]), "rb") as obj:
+            return self._decompress(entry["codec"], obj.read()).decode("utf-8")
+
+    def save(self, url, html, source):
+        """
+        Stores a page if recording is enabled, never letting archive errors break a scrape.
+
+        Args:
+            url (str): The page URL.
+            html (str): The page source.
+            source (str): How the page was fetched.
+        """
+        if not self.record or self.replay:
+            return
+        try:
+            self.store(url, html, source)
+        except Exception as e:
+            print(f"Error archiving {url}: {e}")
+
+    @contextmanager
+    def replaying(self, root=None):
+        """
+        Serves pages from the archive for the duration of the `with` block.
+
+        Args:
+            root (str): Optionally replay from a different archive directory.
+        """
+        previous = (self.root, self.replay, self._latest)
+        if root is not None:
+            self.root, self._latest = root, None
+        self.replay = True
+        try:
+            yield self
+        finally:
+            self.root, self.replay, self._latest = previous
+
+page_archive = PageArchive(
+    record=os.getenv("SCRAPER_ARCHIVE", "1") != "0",
+    replay=os.getenv("SCRAPER_REPLAY", "0") == "1",
+)
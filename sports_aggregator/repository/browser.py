@@ -1,6 +1,19 @@
 # repository/browser.py
 #pylint: disable= unused-import,trailing-whitespace,line-too-long
+import os
+import time
+import queue
+import asyncio
+import logging
+import atexit
+import functools
+import threading
+import contextvars
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
+from selenium.common.exceptions import WebDriverException, TimeoutException
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
@@ -8,7 +21,25 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
-import webdriver_manager.chrome import chromeDriverManager# Adds chromedriver binary to path
+from webdriver_manager.chrome import ChromeDriverManager # Adds chromedriver binary to path
+from repository.blocking import profile_for, apply_profile, drain_network_log, record_page
+from repository import telemetry
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.getenv("SCRAPER_POOL_SIZE", "2"))
+MAX_DRIVER_USES = int(os.getenv("SCRAPER_MAX_DRIVER_USES", "50"))
+BROWSER_WORKERS = int(os.getenv("SCRAPER_BROWSER_WORKERS", str(POOL_SIZE * 2)))
+
+@functools.lru_cache(maxsize=None)
+def chromedriver_path():
+    """
+    Resolves the chromedriver binary once per process.
+
+    Returns:
+        str: Path to the chromedriver executable.
+    """
+    return ChromeDriverManager().install()
 
 def init_driver():
     chrome_options = Options()
@@ -26,7 +57,7 @@ def init_driver():
     )
     chrome_options.add_argument("--disable-javascript")
     #chrome_options.add_argument("--disk-cache-dir=./cache")  # Changed to a local directory
-   
+
 
     prefs = {
         "profile.managed_default_content_settings.images": 2,
@@ -35,10 +66,310 @@ def init_driver():
     chrome_options.add_experimental_option("prefs", prefs)
 
     caps = DesiredCapabilities.CHROME.copy()
-    caps['goog:loggingPrefs'] = {'browser': 'SEVERE'}  # Only capture severe errors
+    caps['goog:loggingPrefs'] = {'browser': 'SEVERE', 'performance': 'ALL'}  # Severe errors, plus network events for blocking stats
+    chrome_options.set_capability('goog:loggingPrefs', caps['goog:loggingPrefs'])
 
-    service = Service(chromeDriverManager.install())
+    service = Service(chromedriver_path())
     driver = webdriver.Chrome(service=service, options=chrome_options)
-    
+
     return driver
 
+class DriverPool:
+    """
+    Bounded pool of warm headless Chrome instances.
+
+    Drivers are checked out with the `driver()` context manager and returned
+    to the pool afterwards, so a browser is launched only when no idle,
+    healthy instance is available. At most `max_size` drivers exist at once.
+    """
+
+    def __init__(self, max_size=POOL_SIZE, factory=init_driver, max_uses=MAX_DRIVER_USES):
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self._factory = factory
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.launches = 0
+        self.launch_seconds = 0.0
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """
+        Checks out a driver for the duration of the `with` block.
+
+        Args:
+            timeout (float): Seconds to wait for a free slot, or None to wait forever.
+
+        Raises:
+            TimeoutError: If no driver becomes available within `timeout`.
+
+        Yields:
+            webdriver.Chrome: A healthy driver with a clean session.
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("No browser available in the driver pool")
+        driver = None
+        try:
+            driver = self._take()
+            yield driver
+        except TimeoutException:
+            # A slow page leaves the session usable; the reset on return checks its health
+            raise
+        except WebDriverException:
+            # A crashed or wedged browser is not worth resetting
+            self._discard(driver)
+            driver = None
+            raise
+        finally:
+            if driver is not None:
+                self._give_back(driver)
+            self._slots.release()
+
+    def close(self):
+        """
+        Quits every idle driver and stops the pool from keeping new ones.
+        """
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def _take(self):
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                started = time.monotonic()
+                with telemetry.stage('browser_launch'):
+                    driver = self._factory()
+                with self._lock:
+                    self._uses[id(driver)] = 0
+                    self.launches += 1
+                    self.launch_seconds += time.monotonic() - started
+                return driver
+            if self._is_healthy(driver):
+                return driver
+            self._discard(driver)
+
+    def _give_back(self, driver):
+        with self._lock:
+            uses = self._uses.get(id(driver), 0) + 1
+            self._uses[id(driver)] = uses
+        if self._closed or uses >= self.max_uses or not self._reset(driver):
+            self._discard(driver)
+            return
+        self._idle.put(driver)
+
+    def _discard(self, driver):
+        if driver is None:
+            return
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e: # pylint: disable=broad-except
+            print(f"Error quitting browser: {e}")
+
+    @staticmethod
+    def _is_healthy(driver):
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception: # pylint: disable=broad-except
+            return False
+
+    @staticmethod
+    def _reset(driver):
+        """
+        Closes extra tabs, clears cookies and navigates away from the last page.
+        """
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            driver.switch_to.default_content()
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+            return True
+        except Exception: # pylint: disable=broad-except
+            return False
+
+driver_pool = DriverPool()
+atexit.register(driver_pool.close)
+
+# Threads running blocking scraper calls on behalf of async code, so the event loop never waits on Selenium
+browser_executor = ThreadPoolExecutor(max_workers=BROWSER_WORKERS, thread_name_prefix="browser")
+
+async def run_blocking(func, *args, timeout=None, timeout_from_start=False, **kwargs):
+    """
+    Awaits a blocking scraper call on the browser executor.
+
+    Cancelling the awaiting task, or hitting `timeout`, drops the call if it
+    has not started yet. A call already running finishes in its thread and
+    its result is discarded.
+
+    Args:
+        func (callable): The blocking function.
+        *args: Positional arguments for `func`.
+        timeout (float): Seconds to wait for the result, or None to wait forever.
+        timeout_from_start (bool): Count `timeout` from when the call starts running instead of
+            from now, so time queued behind other calls on the executor does not use it up.
+        **kwargs: Keyword arguments for `func`.
+
+    Raises:
+        asyncio.TimeoutError: If the call did not finish within `timeout`.
+
+    Returns:
+        The result of `func`.
+    """
+    loop = asyncio.get_running_loop()
+    started = asyncio.Event()
+    # The call runs in the caller's context, so its telemetry is labelled with the awaiting scraper
+    context = contextvars.copy_context()
+
+    def run():
+        loop.call_soon_threadsafe(started.set)
+        return context.run(func, *args, **kwargs)
+
+    call = loop.run_in_executor(browser_executor, run)
+    try:
+        if timeout_from_start and timeout is not None:
+            waiter = asyncio.ensure_future(started.wait())
+            try:
+                await asyncio.wait({call, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiter.cancel()
+        return await asyncio.wait_for(call, timeout)
+    except asyncio.TimeoutError:
+        logger.warning("%s timed out after %ss", getattr(func, '__name__', func), timeout)
+        raise
+    except asyncio.CancelledError:
+        call.cancel()
+        raise
+
+ReadyCheck = namedtuple('ReadyCheck', ['label', 'condition', 'timeout', 'selector'], defaults=[None])
+ReadyCheck.__doc__ = """
+A readiness condition for one extractor: a Selenium expected condition, the
+longest time worth waiting for it and, when it can be expressed as one, the
+CSS selector that must match in the finished HTML.
+"""
+
+def rows_present(css_selector, min_rows=1):
+    """
+    Expected condition that holds once the element matching `css_selector`
+    contains at least `min_rows` table rows.
+
+    Args:
+        css_selector (str): CSS selector of the table, tbody or container.
+        min_rows (int): Minimum number of `tr` descendants required.
+
+    Returns:
+        callable: A condition usable with WebDriverWait.
+    """
+    def _condition(driver):
+        rows = driver.find_elements(By.CSS_SELECTOR, f"{css_selector} tr")
+        return rows if len(rows) >= min_rows else False
+    return _condition
+
+def wait_until_ready(driver, check):
+    """
+    Waits until `check.condition` holds or `check.timeout` expires, logging how long it took.
+
+    A timeout is not an error here: the caller parses whatever has rendered,
+    just as it did after a fixed sleep.
+
+    Args:
+        driver (webdriver.Chrome): The driver that has navigated to the page.
+        check (ReadyCheck): The readiness condition for the extractor.
+
+    Returns:
+        bool: True if the page became ready in time, False otherwise.
+    """
+    started = time.monotonic()
+    try:
+        WebDriverWait(driver, check.timeout).until(check.condition)
+        logger.info("%s ready after %.2fs", check.label, time.monotonic() - started)
+        return True
+    except TimeoutException:
+        logger.warning("%s not ready after %.2fs, parsing anyway", check.label, time.monotonic() - started)
+        return False
+
+def element_ready(label, css_selector, timeout):
+    """
+    Builds a ReadyCheck that holds once `css_selector` matches an element.
+
+    Args:
+        label (str): Name used in log messages.
+        css_selector (str): CSS selector of the element the extractor needs.
+        timeout (float): Longest wait in seconds.
+
+    Returns:
+        ReadyCheck: The readiness condition.
+    """
+    return ReadyCheck(label, EC.presence_of_element_located((By.CSS_SELECTOR, css_selector)), timeout, css_selector)
+
+def rows_ready(label, css_selector, timeout, min_rows=1):
+    """
+    Builds a ReadyCheck that holds once `css_selector` contains table rows.
+
+    Args:
+        label (str): Name used in log messages.
+        css_selector (str): CSS selector of the table, tbody or container.
+        timeout (float): Longest wait in seconds.
+        min_rows (int): Minimum number of rows required.
+
+    Returns:
+        ReadyCheck: The readiness condition.
+    """
+    return ReadyCheck(label, rows_present(css_selector, min_rows), timeout, f"{css_selector} tr")
+
+def all_ready(label, *checks):
+    """
+    Combines several ReadyChecks for extractors that share one page load.
+
+    Args:
+        label (str): Name used in log messages.
+        *checks (ReadyCheck): The extractors' readiness conditions.
+
+    Returns:
+        ReadyCheck: A condition that holds once all of `checks` hold.
+    """
+    return ReadyCheck(label, EC.all_of(*(check.condition for check in checks)), max(check.timeout for check in checks))
+
+def render_page(url, ready=None, prepare=None, blocking=None):
+    """
+    Loads a page in a pooled browser and returns the rendered HTML.
+
+    Args:
+        url (str): The page to load.
+        ready (ReadyCheck): Optional readiness condition to wait for before reading the page.
+        prepare (callable): Optional step run with the driver after navigation, e.g. dismissing a consent dialog.
+        blocking (str): Name of the request blocking profile, or None for the one of the URL's host.
+
+    Returns:
+        tuple: (page source, whether `ready` held before the page was read; True without a condition).
+    """
+    profile = profile_for(url, blocking)
+    is_ready = True
+    with driver_pool.driver() as driver:
+        drain_network_log(driver)  # Drop events of the previous page
+        apply_profile(driver, profile)
+        with telemetry.stage('navigate', url):
+            driver.get(url)
+        if prepare is not None:
+            with telemetry.stage('prepare', url):
+                prepare(driver)
+        if ready is not None:
+            with telemetry.stage('ready_wait', url):
+                is_ready = wait_until_ready(driver, ready)
+                if not is_ready:
+                    telemetry.fail('ready_wait', url)
+        html = driver.page_source
+        record_page(driver, url, profile)
+        return html, is_ready
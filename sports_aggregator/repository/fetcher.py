@@ -0,0 +1,321 @@
+# repository/fetcher.py
+#pylint: disable= trailing-whitespace,line-too-long,broad-except
+"""
+Two-tier page fetching: a pooled aiohttp GET first, a pooled browser second.
+
+Wikipedia and ESPN serve their content in the initial HTML, so a plain HTTP
+request is enough and takes milliseconds instead of a browser navigation.
+Sources that need JavaScript, and pages whose expected element is missing
+from the plain response, are escalated to the Selenium driver pool. Both tiers
+take a slot from the per-domain governor before going to the network.
+"""
+import os
+import json
+import atexit
+import asyncio
+import logging
+import threading
+from urllib.parse import urlsplit
+import aiohttp
+from repository.browser import render_page, run_blocking
+from repository.snapshots import snapshot_cache
+from repository.archive import page_archive
+from repository.parsing import parse
+from repository.governor import governor, GovernorRejected
+from repository.blocking import profile_for
+from repository import telemetry
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/87.0.4280.88 Safari/537.36"
+
+# Serve every request from this origin instead, as http://origin/<host><path>; used by the offline benchmarks
+LOCAL_ORIGIN = os.getenv("SCRAPER_LOCAL_ORIGIN")
+
+# Hosts whose pages are server-rendered; anything not listed goes through the browser
+STATIC_SOURCES = {
+    'en.wikipedia.org',
+    'www.espn.in',
+    'espn.in',
+    'www.espn.com',
+}
+
+def needs_js(url):
+    """
+    Tells whether a URL's source must be rendered in a browser.
+
+    Args:
+        url (str): The page URL.
+
+    Returns:
+        bool: False for known server-rendered hosts, True otherwise.
+    """
+    return urlsplit(url).hostname not in STATIC_SOURCES
+
+def network_url(url):
+    """
+    Returns the URL actually requested for `url`, which differs only when LOCAL_ORIGIN is set.
+
+    Args:
+        url (str): The page URL.
+
+    Returns:
+        str: The URL to request.
+    """
+    if not LOCAL_ORIGIN:
+        return url
+    parts = urlsplit(url)
+    return f"{LOCAL_ORIGIN}/{parts.hostname}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else "")
+
+def has_selector(html, selector):
+    """
+    Checks that the HTML contains an element matching `selector`.
+
+    Args:
+        html (str): Page source.
+        selector (str): CSS selector, or None to accept any page.
+
+    Returns:
+        bool: True if the selector matches or no selector was given.
+    """
+    if not selector:
+        return True
+    return parse(html).select_one(selector) is not None
+
+class HttpFetcher:
+    """
+    Plain HTTP client with per-host connection pooling and keep-alive.
+
+    The aiohttp session lives on a private event loop in a daemon thread, so
+    its connections are reused by synchronous scrapers, by async routes on
+    the uvicorn loop and by batch fetches alike.
+    """
+
+    def __init__(self, limit=32, limit_per_host=6, timeout=15):
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._timeout = timeout
+        self._loop = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="http-fetcher", daemon=True).start()
+        return self._loop
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._limit,
+                limit_per_host=self._limit_per_host,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"User-Agent": USER_AGENT},
+                timeout=aiohttp.ClientTimeout(total=self._timeout),
+            )
+        return self._session
+
+    async def _fetch(self, url, function=''):
+        # Runs on the fetcher's loop, outside the caller's context, so the caller's function is passed along
+        session = await self._get_session()
+        async with governor.slot_async(url):
+            with telemetry.stage('http_fetch', url, function=function):
+                async with session.get(url) as response:
+                    body = await response.read()
+                    telemetry.count_bytes(url, len(body), 'http', function=function)
+                    return response.status, await response.text()
+
+    async def _fetch_many(self, urls, function=''):
+        return await asyncio.gather(*(self._fetch(url, function) for url in urls), return_exceptions=True)
+
+    def fetch(self, url):
+        """
+        Fetches a URL from synchronous code.
+
+        Args:
+            url (str): The page URL.
+
+        Returns:
+            tuple: (status, html).
+        """
+        return asyncio.run_coroutine_threadsafe(self._fetch(url, telemetry.current_function()), self._ensure_loop()).result()
+
+    async def fetch_async(self, url):
+        """
+        Fetches a URL from any event loop without blocking it.
+
+        Args:
+            url (str): The page URL.
+
+        Returns:
+            tuple: (status, html).
+        """
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._fetch(url, telemetry.current_function()), self._ensure_loop()))
+
+    def fetch_many(self, urls):
+        """
+        Fetches several URLs concurrently.
+
+        Args:
+            urls (list): Page URLs.
+
+        Returns:
+            list: (status, html) tuples or exceptions, in the order of `urls`.
+        """
+        return asyncio.run_coroutine_threadsafe(self._fetch_many(urls, telemetry.current_function()), self._ensure_loop()).result()
+
+    def close(self):
+        """
+        Closes the pooled connections.
+        """
+        if self._loop is not None and self._session is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result(timeout=5)
+            except Exception as e:
+                print(f"Error closing HTTP session: {e}")
+
+http_fetcher = HttpFetcher()
+atexit.register(http_fetcher.close)
+
+def _accept(url, result, ready):
+    """
+    Returns the HTML from a plain HTTP result, or None if the page must be rendered instead.
+    """
+    if isinstance(result, Exception):
+        logger.info("HTTP fetch of %s failed (%s), using browser", url, result)
+        return None
+    status, html = result
+    if status != 200:
+        logger.info("HTTP fetch of %s returned %s, using browser", url, status)
+        return None
+    if ready is not None and not has_selector(html, ready.selector):
+        logger.info("%s missing from plain HTML of %s, using browser", ready.label, url)
+        return None
+    return html
+
+def _load(url, ready, prepare=None, blocking=None):
+    """
+    Returns (html, whether it may be cached): a render whose readiness check failed is not shared.
+    """
+    if page_archive.replay:
+        return page_archive.lookup(url), True
+    if not needs_js(url):
+        try:
+            result = http_fetcher.fetch(network_url(url))
+        except GovernorRejected:
+            raise
+        except Exception as e:
+            result = e
+        html = _accept(url, result, ready)
+        if html is not None:
+            page_archive.save(url, html, 'http')
+            return html, True
+    with governor.slot(url):
+        html, is_ready = render_page(network_url(url), ready, prepare, profile_for(url, blocking).name)
+    page_archive.save(url, html, 'browser')
+    return html, is_ready
+
+def get_page(url, ready=None, prepare=None, blocking=None):
+    """
+    Returns a page's HTML, over plain HTTP when possible and from the browser otherwise.
+
+    Recently fetched pages are served from the snapshot cache, so extractors
+    reading the same URL share one navigation. Fetched pages are recorded in
+    the page archive, and in replay mode they are served from it instead.
+
+    Args:
+        url (str): The page URL.
+        ready (ReadyCheck): Readiness condition of the extractor; its selector validates the plain response.
+        prepare (callable): Optional step run in the browser after navigation.
+        blocking (str): Request blocking profile for browser loads, see repository/blocking.py.
+
+    Raises:
+        GovernorRejected: If the source's rate or concurrency limit did not free up in time.
+
+    Returns:
+        str: The page source.
+    """
+    return snapshot_cache.get_or_load(url, lambda url: _load(url, ready, prepare, blocking))
+
+async def get_page_async(url, ready=None, blocking=None):
+    """
+    Async variant of get_page. Browser escalation runs on the bounded browser executor.
+
+    Args:
+        url (str): The page URL.
+        ready (ReadyCheck): Readiness condition of the extractor.
+        blocking (str): Request blocking profile for browser loads.
+
+    Returns:
+        str: The page source.
+    """
+    html = snapshot_cache.get(url)
+    if html is not None:
+        return html
+    if not needs_js(url) and not page_archive.replay:
+        try:
+            result = await http_fetcher.fetch_async(network_url(url))
+        except GovernorRejected:
+            raise
+        except Exception as e:
+            result = e
+        html = _accept(url, result, ready)
+        if html is not None:
+            snapshot_cache.put(url, html)
+            page_archive.save(url, html, 'http')
+            return html
+    return await run_blocking(get_page, url, ready, blocking=blocking)
+
+def get_pages(urls, ready=None):
+    """
+    Fetches several pages, all plain-HTTP ones concurrently.
+
+    Args:
+        urls (list): Page URLs.
+        ready (ReadyCheck): Readiness condition shared by the pages.
+
+    Returns:
+        list: Page sources in the order of `urls`.
+    """
+    cached = {url: snapshot_cache.get(url) for url in urls}
+    static = [url for url in urls if cached[url] is None and not needs_js(url) and not page_archive.replay]
+    results = dict(zip(static, http_fetcher.fetch_many([network_url(url) for url in static]))) if static else {}
+    pages = []
+    for url in urls:
+        html = cached[url]
+        if html is None and url in results:
+            html = _accept(url, results[url], ready)
+            if html is not None:
+                snapshot_cache.put(url, html)
+                page_archive.save(url, html, 'http')
+        pages.append(html if html is not None else get_page(url, ready))
+    return pages
+
+def get_json(url):
+    """
+    Fetches a JSON API response over plain HTTP; APIs never go to the browser.
+
+    Responses are recorded in the page archive and served from it in replay mode.
+
+    Args:
+        url (str): The API URL.
+
+    Raises:
+        ValueError: If the API did not answer with HTTP 200.
+
+    Returns:
+        The decoded JSON.
+    """
+    if page_archive.replay:
+        return json.loads(page_archive.lookup(url))
+    status, body = http_fetcher.fetch(network_url(url))
+    if status != 200:
+        raise ValueError(f"{url} returned HTTP {status}")
+    page_archive.save(url, body, 'http')
+    return json.loads(body)
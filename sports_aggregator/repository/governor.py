@@ -0,0 +1,238 @@
+# repository/governor.py
+#pylint: disable= trailing-whitespace,line-too-long
+"""
+Per-source rate limiting and concurrency control for every page fetch.
+
+Each source domain gets a token bucket (sustained requests per second plus a
+burst allowance) and a cap on requests in flight. Plain HTTP fetches and
+browser navigations both take a slot before touching the network, so a
+scheduler run over every team is spread out instead of bursting into
+Google, WhoScored or Transfermarkt throttling. A request that cannot get a
+slot within `SCRAPER_GOVERNOR_MAX_WAIT` seconds is rejected rather than left
+queuing behind stalled ones.
+
+Settings:
+    SCRAPER_GOVERNOR_MAX_WAIT: longest wait for a slot in seconds, default 120
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import namedtuple
+from contextlib import contextmanager, asynccontextmanager
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+DomainLimit = namedtuple('DomainLimit', ['rate', 'burst', 'max_in_flight'])
+
+DOMAIN_LIMITS = {
+    'google.com': DomainLimit(rate=0.5, burst=4, max_in_flight=2),
+    'whoscored.com': DomainLimit(rate=0.5, burst=3, max_in_flight=2),
+    'transfermarkt.co.in': DomainLimit(rate=0.5, burst=3, max_in_flight=2),
+    'espn.in': DomainLimit(rate=2, burst=5, max_in_flight=4),
+    'espn.com': DomainLimit(rate=2, burst=5, max_in_flight=4),
+    'en.wikipedia.org': DomainLimit(rate=5, burst=10, max_in_flight=6),
+}
+DEFAULT_LIMIT = DomainLimit(rate=1, burst=5, max_in_flight=4)
+MAX_WAIT = float(os.getenv("SCRAPER_GOVERNOR_MAX_WAIT", "120"))
+
+class GovernorRejected(TimeoutError):
+    """Raised when a request cannot get a slot for its domain in time."""
+
+def domain_of(url):
+    """
+    Returns the governed domain of a URL, without a leading "www.".
+
+    Args:
+        url (str): The page URL.
+
+    Returns:
+        str: The domain key.
+    """
+    host = urlsplit(url).hostname or ''
+    return host[4:] if host.startswith('www.') else host
+
+class _Domain:
+    """
+    Token bucket, in-flight counter and metrics of one domain.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.tokens = float(limit.burst)
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.requests = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.rejected = 0
+
+    def refill(self, now):
+        self.tokens = min(self.limit.burst, self.tokens + (now - self.updated) * self.limit.rate)
+        self.updated = now
+
+class Governor:
+    """
+    Shared per-domain token buckets and in-flight limits.
+
+    Use `slot(url)` around blocking fetches and `slot_async(url)` inside
+    coroutines; both raise GovernorRejected when no slot frees up in time.
+    """
+
+    def __init__(self, limits=None, default=DEFAULT_LIMIT, max_wait=MAX_WAIT):
+        self.limits = DOMAIN_LIMITS if limits is None else limits
+        self.default = default
+        self.max_wait = max_wait
+        self._domains = {}
+        self._lock = threading.Lock()
+        self._freed = threading.Condition(self._lock)
+
+    def _domain(self, name):
+        state = self._domains.get(name)
+        if state is None:
+            state = self._domains[name] = _Domain(self.limits.get(name, self.default))
+        return state
+
+    def _try_enter(self, name, deadline):
+        """
+        Takes an in-flight slot and reserves a token if possible.
+
+        Returns the seconds to sleep before the request may start, or None if
+        the in-flight limit is reached. Raises GovernorRejected if the token
+        would only be available after the deadline.
+        """
+        now = time.monotonic()
+        state = self._domain(name)
+        if state.in_flight >= state.limit.max_in_flight:
+            if now >= deadline:
+                state.rejected += 1
+                raise GovernorRejected(f"No free slot for {name} within {self.max_wait}s")
+            return None
+        state.refill(now)
+        delay = 0.0 if state.tokens >= 1 else (1 - state.tokens) / state.limit.rate
+        if now + delay > deadline:
+            state.rejected += 1
+            raise GovernorRejected(f"Rate limit for {name} exceeded the {self.max_wait}s wait budget")
+        state.tokens -= 1
+        state.in_flight += 1
+        state.requests += 1
+        return delay
+
+    def _record_wait(self, name, seconds):
+        if seconds > 0.001:
+            with self._lock:
+                state = self._domain(name)
+                state.waited += 1
+                state.wait_seconds += seconds
+            logger.info("Waited %.2fs for a %s slot", seconds, name)
+
+    def _release(self, name):
+        with self._lock:
+            self._domain(name).in_flight -= 1
+            self._freed.notify_all()
+
+    def acquire(self, url, timeout=None):
+        """
+        Blocks until a request to the URL's domain is allowed.
+
+        Args:
+            url (str): The page URL.
+            timeout (float): Longest wait, defaults to `max_wait`.
+
+        Raises:
+            GovernorRejected: If no slot became available in time.
+
+        Returns:
+            str: The domain key to pass to `release`.
+        """
+        name = domain_of(url)
+        started = time.monotonic()
+        deadline = started + (self.max_wait if timeout is None else timeout)
+        with self._lock:
+            delay = self._try_enter(name, deadline)
+            while delay is None:
+                self._freed.wait(max(0.0, deadline - time.monotonic()))
+                delay = self._try_enter(name, deadline)
+        try:
+            if delay:
+                time.sleep(delay)
+            self._record_wait(name, time.monotonic() - started)
+        except BaseException:
+            self._release(name)
+            raise
+        return name
+
+    def release(self, name):
+        """
+        Frees the in-flight slot taken by `acquire`.
+
+        Args:
+            name (str): The domain key returned by `acquire`.
+        """
+        self._release(name)
+
+    @contextmanager
+    def slot(self, url, timeout=None):
+        """
+        Holds a request slot for the URL's domain for the duration of the `with` block.
+
+        Args:
+            url (str): The page URL.
+            timeout (float): Longest wait, defaults to `max_wait`.
+        """
+        name = self.acquire(url, timeout)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+    @asynccontextmanager
+    async def slot_async(self, url, timeout=None):
+        """
+        Async variant of `slot` that waits without blocking the event loop.
+
+        Args:
+            url (str): The page URL.
+            timeout (float): Longest wait, defaults to `max_wait`.
+        """
+        name = domain_of(url)
+        started = time.monotonic()
+        deadline = started + (self.max_wait if timeout is None else timeout)
+        while True:
+            with self._lock:
+                delay = self._try_enter(name, deadline)
+            if delay is not None:
+                break
+            await asyncio.sleep(0.05)
+        # The slot is taken from here on; a cancellation during the pacing delay must still free it
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            self._record_wait(name, time.monotonic() - started)
+            yield
+        finally:
+            self._release(name)
+
+    def metrics(self):
+        """
+        Returns request, wait and rejection counters per domain.
+
+        Returns:
+            dict: Domain key to a dict of counters.
+        """
+        with self._lock:
+            return {
+                name: {
+                    'requests': state.requests,
+                    'in_flight': state.in_flight,
+                    'waited': state.waited,
+                    'wait_seconds': round(state.wait_seconds, 3),
+                    'rejected': state.rejected,
+                    'tokens': round(state.tokens, 2),
+                }
+                for name, state in self._domains.items()
+            }
+
+governor = Governor()
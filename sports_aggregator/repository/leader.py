@@ -0,0 +1,102 @@
+# repository/leader.py
+#pylint: disable= trailing-whitespace,line-too-long,broad-except,import-error
+"""
+Leader election over a lease row in the database.
+
+Work that must run in exactly one process, such as the scheduled refresh,
+is guarded by a lease: a row in the scrape_locks table owned by one process
+and valid until its expiry. The owner renews it every third of its
+lifetime. Other processes check every renewal interval and take the lease
+over once the leader stops renewing it, e.g. because it died. A leader that
+fails to renew steps down at once, so two processes never both act as
+leader for long.
+
+Settings:
+    SCRAPER_LEASE_TTL: seconds a lease stays valid without renewal, default 30
+"""
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+from db_model.database.database import SessionLocal
+from db_model.models import models
+from repository.single_flight import OWNER, ensure_lock_table, try_lock, unlock
+
+logger = logging.getLogger(__name__)
+
+LEASE_TTL = float(os.getenv("SCRAPER_LEASE_TTL", "30"))
+
+class LeaderLease:
+    """
+    A named lease held by at most one process at a time.
+    """
+
+    def __init__(self, name, ttl=LEASE_TTL):
+        self.key = f"leader:{name}"
+        self.ttl = ttl
+        self.is_leader = False
+        self.elections = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _renew(self):
+        db = SessionLocal()
+        try:
+            renewed = db.query(models.ScrapeLock).filter(
+                models.ScrapeLock.key == self.key,
+                models.ScrapeLock.owner == OWNER
+            ).update({'expires_at': datetime.utcnow() + timedelta(seconds=self.ttl)})
+            db.commit()
+            return renewed == 1
+        finally:
+            db.close()
+
+    def check(self):
+        """
+        Renews the lease if this process holds it, otherwise tries to take it.
+
+        Returns:
+            bool: Whether this process is the leader.
+        """
+        try:
+            ensure_lock_table()
+            leader = self._renew() or try_lock(self.key, self.ttl)
+        except Exception as e:
+            print(f"Error renewing {self.key} lease: {e}")
+            leader = False
+        if leader and not self.is_leader:
+            self.elections += 1
+            logger.info("%s is now the %s leader", OWNER, self.key)
+        elif self.is_leader and not leader:
+            logger.warning("%s lost the %s lease", OWNER, self.key)
+        self.is_leader = leader
+        return leader
+
+    def _loop(self):
+        while not self._stop.wait(self.ttl / 3):
+            self.check()
+
+    def start(self):
+        """
+        Runs an election now and keeps renewing or contending in a background thread.
+        """
+        self._stop.clear()
+        self.check()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name=f"{self.key}-lease", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stops contending and releases the lease, so another process can take over without waiting for it to expire.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.is_leader:
+            self.is_leader = False
+            try:
+                unlock(self.key)
+            except Exception as e:
+                print(f"Error releasing {self.key} lease: {e}")
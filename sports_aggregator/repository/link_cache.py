@@ -0,0 +1,202 @@
+# repository/link_cache.py
+#pylint: disable= trailing-whitespace,line-too-long,broad-except,import-error
+"""
+SQLite-backed cache for the Google link finders in the scrapper package.
+
+A club's WhoScored or Transfermarkt URL almost never changes, so resolutions
+are kept per (resolver, normalized name) for a resolver-specific TTL. Misses
+are cached too, for a shorter time. Scrapers that land on a 404 or cannot find
+their target element report the link back, which drops it from the cache so
+the next call searches again.
+"""
+import os
+import re
+import logging
+import functools
+import threading
+from datetime import datetime, timedelta
+from db_model.database.database import SessionLocal, engine
+from db_model.models import models
+
+logger = logging.getLogger(__name__)
+
+RESOLVER_TTL = {
+    'whoscored_team': timedelta(days=30),
+    'transfermarkt_team': timedelta(days=30),
+    'espn_team_news': timedelta(days=7),
+    'wikipedia': timedelta(days=30),
+    'whoscored_player': timedelta(days=30),
+    'espn_player_news': timedelta(days=7),
+    'club_crest': timedelta(days=30),
+}
+DEFAULT_TTL = timedelta(days=7)
+NEGATIVE_TTL = timedelta(hours=6)
+
+# Set SCRAPER_LINK_CACHE=0 to always search, e.g. when benchmarking the finders
+CACHE_ENABLED = os.getenv("SCRAPER_LINK_CACHE", "1") != "0"
+
+NOT_FOUND_PATTERN = re.compile(r"\b404\b|not found", re.IGNORECASE)
+
+_table_ready = threading.Event()
+
+def _ensure_table():
+    if not _table_ready.is_set():
+        models.ResolvedLink.__table__.create(engine, checkfirst=True)
+        _table_ready.set()
+
+def normalize_name(name):
+    """
+    Normalizes a search name so that case and spacing variants share an entry.
+
+    Args:
+        name (str): The team or player name passed to a finder.
+
+    Returns:
+        str: The normalized name.
+    """
+    return ' '.join(str(name).casefold().split())
+
+def is_miss(link):
+    """
+    Tells whether a finder result is one of its "nothing found" values.
+
+    Args:
+        link (str): The value returned by a finder.
+
+    Returns:
+        bool: True for None, empty strings and "No ... link found" messages.
+    """
+    return not link or link.startswith('No ')
+
+def lookup(resolver, name):
+    """
+    Returns the cached resolution for a name if it has not expired.
+
+    Args:
+        resolver (str): Resolver key, e.g. 'whoscored_team'.
+        name (str): The team or player name.
+
+    Returns:
+        tuple: (hit, link) where hit is False when nothing usable is cached.
+    """
+    _ensure_table()
+    db = SessionLocal()
+    try:
+        entry = db.query(models.ResolvedLink).filter(
+            models.ResolvedLink.resolver == resolver,
+            models.ResolvedLink.name == normalize_name(name)
+        ).first()
+        if entry is None:
+            return False, None
+        ttl = RESOLVER_TTL.get(resolver, DEFAULT_TTL) if entry.found else NEGATIVE_TTL
+        if datetime.utcnow() - entry.resolved_at > ttl:
+            return False, None
+        return True, entry.link
+    finally:
+        db.close()
+
+def store(resolver, name, link):
+    """
+    Records a finder result, replacing any earlier entry for the same name.
+
+    Args:
+        resolver (str): Resolver key.
+        name (str): The team or player name.
+        link (str): The value the finder returned, hit or miss.
+    """
+    _ensure_table()
+    db = SessionLocal()
+    try:
+        db.query(models.ResolvedLink).filter(
+            models.ResolvedLink.resolver == resolver,
+            models.ResolvedLink.name == normalize_name(name)
+        ).delete()
+        db.add(models.ResolvedLink(
+            resolver=resolver,
+            name=normalize_name(name),
+            link=link,
+            found=not is_miss(link),
+            resolved_at=datetime.utcnow()
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+def invalidate(resolver, name):
+    """
+    Drops the cached resolution for one name.
+
+    Args:
+        resolver (str): Resolver key.
+        name (str): The team or player name.
+    """
+    _ensure_table()
+    db = SessionLocal()
+    try:
+        db.query(models.ResolvedLink).filter(
+            models.ResolvedLink.resolver == resolver,
+            models.ResolvedLink.name == normalize_name(name)
+        ).delete()
+        db.commit()
+    finally:
+        db.close()
+
+def report_broken_link(link, page_title=""):
+    """
+    Invalidation hook for scrapers whose page was a 404 or lacked the expected element.
+
+    Every cached resolution pointing at `link` is dropped so the next finder
+    call searches again instead of serving the broken URL for the whole TTL.
+
+    Args:
+        link (str): The URL the scraper was given.
+        page_title (str): Title of the page that was loaded, used to tell a 404 from a selector miss.
+    """
+    if is_miss(link):
+        return
+    reason = "404" if NOT_FOUND_PATTERN.search(page_title or "") else "selector miss"
+    try:
+        _ensure_table()
+        db = SessionLocal()
+        try:
+            removed = db.query(models.ResolvedLink).filter(models.ResolvedLink.link == link).delete()
+            db.commit()
+        finally:
+            db.close()
+        logger.warning("Invalidated %s cached resolution(s) for %s (%s)", removed, link, reason)
+    except Exception as e:
+        print(f"Error invalidating cached link: {e}")
+
+def cached_link(resolver):
+    """
+    Decorator caching a finder's result per (resolver, normalized name).
+
+    The wrapped finder must take the name as its first argument. Cache
+    failures never break a lookup; the finder simply runs uncached.
+
+    Args:
+        resolver (str): Resolver key, also used to pick the TTL.
+
+    Returns:
+        callable: The decorator.
+    """
+    def decorator(finder):
+        @functools.wraps(finder)
+        def wrapper(name, *args, **kwargs):
+            if not CACHE_ENABLED:
+                return finder(name, *args, **kwargs)
+            try:
+                hit, link = lookup(resolver, name)
+                if hit:
+                    return link
+            except Exception as e:
+                print(f"Error reading link cache: {e}")
+            link = finder(name, *args, **kwargs)
+            try:
+                store(resolver, name, link)
+            except Exception as e:
+                print(f"Error writing link cache: {e}")
+            return link
+        wrapper.uncached = finder
+        return wrapper
+    return decorator
@@ -0,0 +1,82 @@
+# repository/parsing.py
+#pylint: disable= trailing-whitespace,line-too-long,unused-import
+"""
+HTML parsing helpers shared by the scrapers.
+
+Pages are parsed with lxml when it is installed and with the standard library
+parser otherwise. Extractors pass a SoupStrainer describing the one table or
+element list they read, so only that subtree is built instead of the whole
+WhoScored, Transfermarkt or ESPN page.
+"""
+import re
+import time
+import threading
+from bs4 import BeautifulSoup, SoupStrainer
+from repository import telemetry
+
+try:
+    import lxml  # Optional, noticeably faster than html.parser
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+TITLE_PATTERN = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+# Cumulative parse calls and time, read by the benchmarks
+parse_stats = {'calls': 0, 'seconds': 0.0}
+_stats_lock = threading.Lock()
+
+def class_token(name):
+    """
+    Matches an element having `name` among its classes.
+
+    While a page is being parsed, SoupStrainer sees the class attribute as one
+    string, so a plain class name only matches elements with no other class.
+
+    Args:
+        name (str): A single CSS class.
+
+    Returns:
+        re.Pattern: Pattern usable as a class_ filter.
+    """
+    return re.compile(rf"(?:^|\s){re.escape(name)}(?:\s|$)")
+
+def parse(page, only=None, parser=None):
+    """
+    Parses HTML, keeping only the part matched by `only`.
+
+    Args:
+        page (str | BeautifulSoup): The page; an already parsed soup is returned unchanged.
+        only (SoupStrainer): Restricts the tree to matching elements, or None for the whole page.
+        parser (str): Overrides the parser, mainly for benchmarks.
+
+    Returns:
+        BeautifulSoup: The parsed (sub)tree.
+    """
+    if isinstance(page, BeautifulSoup):
+        return page
+    started = time.perf_counter()
+    with telemetry.stage('parse'):
+        soup = BeautifulSoup(page, parser or PARSER, parse_only=only)
+    with _stats_lock:
+        parse_stats['calls'] += 1
+        parse_stats['seconds'] += time.perf_counter() - started
+    return soup
+
+def page_title(page):
+    """
+    Returns the <title> of a page without parsing it, or an empty string.
+
+    Args:
+        page (str | BeautifulSoup): The page.
+
+    Returns:
+        str: The page title.
+    """
+    if isinstance(page, BeautifulSoup):
+        return page.title.text if page.title else ""
+    match = TITLE_PATTERN.search(page or "")
+    return match.group(1).strip() if match else ""
+
+# Google result blocks read by every link finder
+SERP_RESULTS_ONLY = SoupStrainer('div', class_=class_token('g'))
@@ -0,0 +1,193 @@
+# repository/single_flight.py
+#pylint: disable= trailing-whitespace,line-too-long,broad-except,import-error
+"""
+Keyed single-flight coalescing for scrapes of the same entity.
+
+When several requests ask for the same new player or team at once, only the
+first runs the scrape; the others wait for its result. Within a process the
+callers share a future, from threads and async tasks alike. Across processes
+the leader also holds a row in the scrape_locks table, so a second worker
+process waits for it instead of scraping in parallel. Work run under the lock
+should re-check the database first, since a leader in another process may
+already have stored the result.
+
+Settings:
+    SCRAPER_LOCK_TTL: seconds after which an abandoned lock row is taken over, default 300
+"""
+import os
+import time
+import uuid
+import socket
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from concurrent.futures import Future
+from sqlalchemy.exc import IntegrityError
+from db_model.database.database import SessionLocal, engine
+from db_model.models import models
+
+logger = logging.getLogger(__name__)
+
+LOCK_TTL = float(os.getenv("SCRAPER_LOCK_TTL", "300"))
+LOCK_POLL_INTERVAL = 0.5
+
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_table_ready = threading.Event()
+
+def ensure_lock_table():
+    """
+    Creates the scrape_locks table once per process if it does not exist.
+    """
+    if not _table_ready.is_set():
+        models.ScrapeLock.__table__.create(engine, checkfirst=True)
+        _table_ready.set()
+
+def try_lock(key, ttl):
+    """
+    Takes the lock row of a key for this process, replacing an expired one.
+
+    Args:
+        key (str): The lock key.
+        ttl (float): Seconds after which another process may take the lock over.
+
+    Returns:
+        bool: True if this process now holds the lock.
+    """
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        db.query(models.ScrapeLock).filter(
+            models.ScrapeLock.key == key,
+            models.ScrapeLock.expires_at < now
+        ).delete()
+        db.add(models.ScrapeLock(key=key, owner=OWNER, acquired_at=now, expires_at=now + timedelta(seconds=ttl)))
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+def unlock(key):
+    """
+    Releases the lock row of a key if this process holds it.
+
+    Args:
+        key (str): The lock key.
+    """
+    db = SessionLocal()
+    try:
+        db.query(models.ScrapeLock).filter(
+            models.ScrapeLock.key == key,
+            models.ScrapeLock.owner == OWNER
+        ).delete()
+        db.commit()
+    finally:
+        db.close()
+
+@contextmanager
+def process_lock(key, ttl=LOCK_TTL):
+    """
+    Holds the cross-process lock row of a key for the duration of the `with` block.
+
+    Waits while another process holds it. A row older than `ttl` is treated
+    as abandoned by a crashed process and taken over. Database errors never
+    block a scrape; the work then runs with in-process coalescing only.
+
+    Args:
+        key (str): The entity key, e.g. 'player:lionel messi'.
+        ttl (float): Lifetime of the lock row in seconds.
+    """
+    locked = False
+    try:
+        ensure_lock_table()
+        started = time.monotonic()
+        while not try_lock(key, ttl):
+            if time.monotonic() - started > ttl:
+                logger.warning("Gave up waiting for the %s lock after %ss", key, ttl)
+                break
+            time.sleep(LOCK_POLL_INTERVAL)
+        else:
+            locked = True
+        waited = time.monotonic() - started
+        if waited > LOCK_POLL_INTERVAL:
+            logger.info("Waited %.1fs for another process scraping %s", waited, key)
+    except Exception as e:
+        print(f"Error taking scrape lock: {e}")
+    try:
+        yield
+    finally:
+        if locked:
+            try:
+                unlock(key)
+            except Exception as e:
+                print(f"Error releasing scrape lock: {e}")
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time and shares its outcome with concurrent callers.
+    """
+
+    def __init__(self, ttl=LOCK_TTL):
+        self.ttl = ttl
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def _join(self, key):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _lead(self, key, future, func, args, kwargs):
+        try:
+            with process_lock(key, self.ttl):
+                result = func(*args, **kwargs)
+            future.set_result(result)
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Calls `func(*args, **kwargs)` unless a call for `key` is already in flight, then waits for that one.
+
+        Args:
+            key (str): The entity key.
+            func (callable): The scrape to run.
+
+        Returns:
+            The result of the leading call; its exception is raised to every caller.
+        """
+        future, leader = self._join(key)
+        if leader:
+            self._lead(key, future, func, args, kwargs)
+        return future.result()
+
+    async def do_async(self, key, func, *args, **kwargs):
+        """
+        Async variant of `do`. Blocking `func` runs in the default executor; followers await without a thread.
+
+        Args:
+            key (str): The entity key.
+            func (callable): The scrape to run.
+
+        Returns:
+            The result of the leading call.
+        """
+        future, leader = self._join(key)
+        if leader:
+            await asyncio.get_running_loop().run_in_executor(None, self._lead, key, future, func, args, kwargs)
+        return await asyncio.wrap_future(future)
+
+single_flight = SingleFlight()
@@ -0,0 +1,114 @@
+# repository/snapshots.py
+#pylint: disable= trailing-whitespace,line-too-long
+"""
+Short-lived cache of fetched page HTML keyed by URL.
+
+Several extractors read the same page: fixtures, stats and the team header all
+come from one WhoScored team page. Keeping the rendered HTML for a couple of
+minutes lets them share a single navigation, including across the separate
+requests the front-end sends when it adds a team.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+
+SNAPSHOT_TTL = float(os.getenv("SCRAPER_SNAPSHOT_TTL", "120"))
+SNAPSHOT_MAX_ENTRIES = int(os.getenv("SCRAPER_SNAPSHOT_MAX_ENTRIES", "64"))
+
+class SnapshotCache:
+    """
+    Thread-safe TTL cache of page HTML with at most one load in flight per URL.
+    """
+
+    def __init__(self, ttl=SNAPSHOT_TTL, max_entries=SNAPSHOT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def get(self, url):
+        """
+        Returns the cached HTML for a URL, or None if absent or expired.
+
+        Args:
+            url (str): The page URL.
+
+        Returns:
+            str: The cached HTML or None.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            stored_at, html = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[url]
+                return None
+            self._entries.move_to_end(url)
+            return html
+
+    def put(self, url, html):
+        """
+        Stores the HTML of a URL, evicting the oldest entries beyond `max_entries`.
+
+        Args:
+            url (str): The page URL.
+            html (str): The page source.
+        """
+        with self._lock:
+            self._entries[url] = (time.monotonic(), html)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, url):
+        """
+        Drops a URL from the cache, e.g. after its page turned out to be broken.
+
+        Args:
+            url (str): The page URL.
+        """
+        with self._lock:
+            self._entries.pop(url, None)
+
+    def get_or_load(self, url, loader):
+        """
+        Returns the cached HTML or calls `loader(url)` once, even if several threads ask at the same time.
+
+        Only pages the loader vouches for are cached, so a render that
+        timed out waiting for its content is not served to the next
+        extractor; threads that waited on such a load then load the page
+        themselves, one at a time.
+
+        Args:
+            url (str): The page URL.
+            loader (callable): Function returning (html, whether the page may be cached) for a URL.
+
+        Returns:
+            str: The page source.
+        """
+        html = self.get(url)
+        if html is not None:
+            return html
+        with self._lock:
+            url_lock = self._loading.get(url)
+            created = url_lock is None
+            if created:
+                url_lock = self._loading[url] = threading.Lock()
+        try:
+            with url_lock:
+                html = self.get(url)
+                if html is None:
+                    html, cacheable = loader(url)
+                    if cacheable:
+                        self.put(url, html)
+        finally:
+            # Only the thread that created the lock removes it, so a late arrival cannot start a second load while it is held
+            if created:
+                with self._lock:
+                    self._loading.pop(url, None)
+        return html
+
+snapshot_cache = SnapshotCache()
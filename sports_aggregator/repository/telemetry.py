@@ -0,0 +1,382 @@
+# repository/telemetry.py
+#pylint: disable= trailing-whitespace,line-too-long,broad-except,import-error
+"""
+Per-stage scrape telemetry in the Prometheus text format.
+
+A scrape is split into stages: launching a browser, navigating, the
+consent step, waiting for the page to be ready (the Google results wait
+included), a plain HTTP fetch, parsing and the database commit. The latency
+of each stage goes to a histogram labelled with the stage, the source and
+the scraper function; failed stages, bytes fetched and rows written are
+counted with the same labels. The source is the domain of the page, or the
+dataset for database commits.
+
+The function is the innermost scraper, link finder or job running in the
+current thread or task, set by `instrumented` and `scope`. Stages outside
+any of them are labelled with an empty function.
+
+The registry is a small thread-safe implementation of counters, gauges and
+histograms, so no client library is needed; app/main.py serves `render()`
+at /metrics.
+"""
+import time
+import bisect
+import inspect
+import functools
+import threading
+from contextvars import ContextVar
+from contextlib import contextmanager
+from repository.governor import domain_of
+
+# Latency buckets in seconds, from a parse of a small table to a slow browser load
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+def _number(value):
+    if isinstance(value, int):
+        return str(value)
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+class Metric:
+    """
+    Base of the metric types: a name, a help text and values per label set.
+    """
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def samples(self):
+        """
+        Returns the current samples.
+
+        Returns:
+            list: (name suffix, formatted labels, value) tuples.
+        """
+        with self._lock:
+            return [('', self._labels(key), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        """
+        Returns the metric in the text exposition format.
+
+        Returns:
+            list: Lines of text.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{self.name}{suffix}{labels} {_number(value)}" for suffix, labels, value in self.samples())
+        return lines
+
+class Counter(Metric):
+    """
+    A total that only goes up.
+    """
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """
+        Adds `amount` to the total of a label set.
+
+        Args:
+            amount (float): The increment.
+            **labels: Label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    """
+    A value that is set, e.g. from the live state of a component when rendering.
+    """
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        """
+        Sets the value of a label set.
+
+        Args:
+            value (float): The value.
+            **labels: Label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(Metric):
+    """
+    Observations counted into cumulative buckets, with their sum and count.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """
+        Records one observation.
+
+        Args:
+            value (float): The observed value, e.g. seconds.
+            **labels: Label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            entries = [(key, list(counts), total, count) for key, (counts, total, count) in sorted(self._values.items())]
+        samples = []
+        for key, counts, total, count in entries:
+            cumulative = 0
+            for bound, observed in zip(self.buckets, counts):
+                cumulative += observed
+                samples.append(('_bucket', self._labels(key, [('le', _number(bound))]), cumulative))
+            samples.append(('_bucket', self._labels(key, [('le', '+Inf')]), count))
+            samples.append(('_sum', self._labels(key), total))
+            samples.append(('_count', self._labels(key), count))
+        return samples
+
+class Registry:
+    """
+    The metrics of the process and the collectors refreshing gauges before rendering.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """
+        Adds a metric to the exposition.
+
+        Args:
+            metric (Metric): The metric.
+
+        Returns:
+            Metric: The same metric.
+        """
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def collector(self, func):
+        """
+        Registers a function called before every render, e.g. to set gauges from a component's state.
+
+        Args:
+            func (callable): Called without arguments.
+
+        Returns:
+            callable: The same function, so this works as a decorator.
+        """
+        with self._lock:
+            self._collectors.append(func)
+        return func
+
+    def render(self):
+        """
+        Returns all metrics in the Prometheus text exposition format, version 0.0.4.
+
+        Returns:
+            str: The exposition.
+        """
+        with self._lock:
+            collectors, metrics = list(self._collectors), list(self._metrics)
+        for func in collectors:
+            try:
+                func()
+            except Exception as e:
+                print(f"Error collecting metrics in {getattr(func, '__name__', func)}: {e}")
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    'scraper_stage_seconds', 'Latency of one scrape stage.', ('stage', 'source', 'function')))
+STAGE_FAILURES = registry.register(Counter(
+    'scraper_stage_failures_total', 'Scrape stages that raised or timed out.', ('stage', 'source', 'function')))
+CALL_SECONDS = registry.register(Histogram(
+    'scraper_call_seconds', 'Latency of a scraper, link finder or refresh handler call.', ('function',)))
+CALLS = registry.register(Counter(
+    'scraper_calls_total', 'Scraper, link finder and refresh handler calls by outcome: ok, empty or error.', ('function', 'outcome')))
+FETCHED_BYTES = registry.register(Counter(
+    'scraper_fetched_bytes_total', 'Bytes fetched over plain HTTP or downloaded by the browser.', ('source', 'tier', 'function')))
+ROWS_WRITTEN = registry.register(Counter(
+    'scraper_rows_written_total', 'Rows written to the database by dataset and operation.', ('dataset', 'operation', 'function')))
+
+_function = ContextVar('scrape_function', default='')
+
+def current_function():
+    """
+    Returns the scraper function running in this thread or task.
+
+    Returns:
+        str: The function name, or an empty string.
+    """
+    return _function.get()
+
+@contextmanager
+def scope(function):
+    """
+    Labels the stages of the `with` block with a function name.
+
+    Args:
+        function (str): The name, e.g. a job kind.
+    """
+    token = _function.set(function)
+    try:
+        yield
+    finally:
+        _function.reset(token)
+
+@contextmanager
+def stage(name, url=None, source=None, function=None):
+    """
+    Times the `with` block as one stage, counting it as failed if it raises.
+
+    Args:
+        name (str): Stage name, e.g. 'navigate'.
+        url (str): The page the stage works on; its domain is the source.
+        source (str): The source when there is no URL, e.g. a dataset.
+        function (str): Overrides the current function, for code running outside its context.
+    """
+    labels = {
+        'stage': name,
+        'source': source if source is not None else domain_of(url) if url else '',
+        'function': function if function is not None else _function.get(),
+    }
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_FAILURES.inc(**labels)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, **labels)
+
+def fail(name, url=None, source=None):
+    """
+    Counts a stage as failed without an exception, e.g. a readiness wait that timed out.
+
+    Args:
+        name (str): Stage name.
+        url (str): The page the stage worked on.
+        source (str): The source when there is no URL.
+    """
+    STAGE_FAILURES.inc(stage=name, source=source if source is not None else domain_of(url) if url else '', function=_function.get())
+
+def count_bytes(url, size, tier, function=None):
+    """
+    Counts bytes fetched from a page's source.
+
+    Args:
+        url (str): The page URL.
+        size (int): Bytes fetched.
+        tier (str): 'http' or 'browser'.
+        function (str): Overrides the current function.
+    """
+    FETCHED_BYTES.inc(size, source=domain_of(url), tier=tier, function=function if function is not None else _function.get())
+
+def count_rows(dataset, operation, rows):
+    """
+    Counts rows written to the database.
+
+    Args:
+        dataset (str): The dataset or table, e.g. 'fixtures'.
+        operation (str): 'upserted', 'inserted', 'updated' or 'deleted'.
+        rows (int): The number of rows.
+    """
+    if rows:
+        ROWS_WRITTEN.inc(rows, dataset=dataset, operation=operation, function=_function.get())
+
+def commit(db, dataset):
+    """
+    Commits a session, timed as the 'db_commit' stage of a dataset.
+
+    Args:
+        db (Session): The session.
+        dataset (str): The dataset written.
+    """
+    with stage('db_commit', source=dataset):
+        db.commit()
+
+def _outcome(result):
+    return 'empty' if result is None or result == [] or result == {} else 'ok'
+
+def instrumented(func):
+    """
+    Times every call of a scraper, link finder or handler and counts its outcome.
+
+    Stages run by the call are labelled with its name. Calls returning
+    nothing, as scrapers do when a page had no data, count as 'empty'.
+    Works for plain and coroutine functions.
+
+    Args:
+        func (callable): The function.
+
+    Returns:
+        callable: The instrumented function.
+    """
+    name = func.__name__
+
+    def finish(started, outcome):
+        CALL_SECONDS.observe(time.perf_counter() - started, function=name)
+        CALLS.inc(function=name, outcome=outcome)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            with scope(name):
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException:
+                    finish(started, 'error')
+                    raise
+            finish(started, _outcome(result))
+            return result
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        with scope(name):
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                finish(started, 'error')
+                raise
+        finish(started, _outcome(result))
+        return result
+    return wrapper
@@ -0,0 +1,74 @@
+"""
+Async facade over the scrapper package.
+
+Every finder and scraper has an awaitable counterpart here with the same
+name and arguments. Blocking work runs on the bounded browser executor with
+a per-function timeout, so async routes and jobs can await scrapes without
+stalling the event loop, and cancelling the awaiting task drops calls that
+have not started yet.
+
+Usage:
+    from scrapper import aio
+    link = await aio.find_team_link(team_name)
+"""
+#pylint: disable=  trailing-whitespace,line-too-long,import-error
+import os
+import asyncio
+import functools
+from repository.browser import run_blocking
+from . import search, finder, scrapper_team, scrapper, crests
+
+FIND_TIMEOUT = float(os.getenv("SCRAPER_FIND_TIMEOUT", "60"))
+SCRAPE_TIMEOUT = float(os.getenv("SCRAPER_SCRAPE_TIMEOUT", "120"))
+
+def asyncify(func, timeout):
+    """
+    Wraps a blocking scraper function into a coroutine function.
+
+    Args:
+        func (callable): The blocking function.
+        timeout (float): Default timeout; callers may override it with `timeout=`.
+
+    Returns:
+        callable: The coroutine function.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, timeout=timeout, **kwargs):
+        return await run_blocking(func, *args, timeout=timeout, **kwargs)
+    return wrapper
+
+# Link finders
+find_wikipedia_link = asyncify(search.find_wikipedia_link, FIND_TIMEOUT)
+find_stat_link = asyncify(search.find_stat_link, FIND_TIMEOUT)
+find_news_link = asyncify(search.find_news_link, FIND_TIMEOUT)
+find_team_link = asyncify(finder.find_team_link, FIND_TIMEOUT)
+team_player_link = asyncify(finder.team_player_link, FIND_TIMEOUT)
+team_news_link = asyncify(finder.team_news_link, FIND_TIMEOUT)
+
+# Team scrapers
+fetch_team_page = asyncify(scrapper_team.fetch_team_page, SCRAPE_TIMEOUT)
+scrape_fixtures = asyncify(scrapper_team.scrape_fixtures, SCRAPE_TIMEOUT)
+scrape_stats = asyncify(scrapper_team.scrape_stats, SCRAPE_TIMEOUT)
+scrape_name_image = asyncify(scrapper_team.scrape_name_image, SCRAPE_TIMEOUT)
+scrape_players = asyncify(scrapper_team.scrape_players, SCRAPE_TIMEOUT)
+
+async def scrape_news(link, timeout=SCRAPE_TIMEOUT):
+    """
+    Scrapes team news, giving up after `timeout` seconds.
+
+    Args:
+        link (str): The ESPN team news URL.
+        timeout (float): Seconds to wait for the result.
+
+    Returns:
+        list: News items as dictionaries.
+    """
+    return await asyncio.wait_for(scrapper_team.scrape_news(link), timeout)
+
+# Player scrapers
+scrape_player_data = asyncify(scrapper.scrape_player_data, SCRAPE_TIMEOUT)
+scrape_player_stats = asyncify(scrapper.scrape_player_stats, SCRAPE_TIMEOUT)
+scrape_player_news = asyncify(scrapper.scrape_player_news, SCRAPE_TIMEOUT)
+scrape_player_name = asyncify(scrapper.scrape_player_name, SCRAPE_TIMEOUT)
+find_articles = asyncify(scrapper.find_articles, SCRAPE_TIMEOUT)
+resolve_crest = asyncify(crests.resolve_crest, SCRAPE_TIMEOUT)
@@ -0,0 +1,181 @@
+"""
+Module resolving club crest images for player profiles.
+
+Crests are keyed by club name and kept in the link cache. A club already in
+the team table reuses its stored image; anything else is looked up on
+Wikipedia in the background, so a cold player lookup never waits for it.
+"""
+#pylint: disable=  trailing-whitespace,line-too-long,broad-except,import-error
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fuzzywuzzy import fuzz
+from sqlalchemy import or_
+from db_model.database.database import SessionLocal
+from db_model.models import models
+from repository.browser import element_ready
+from repository.fetcher import get_page
+from repository.link_cache import cached_link, lookup, store, is_miss
+from repository.telemetry import instrumented
+from .search import find_wikipedia_link
+from .infobox import read_infobox
+
+CREST_READY = element_ready('club infobox', 'td.infobox-image img', 10)
+
+# Minimum similarity of the stripped names for a team row to count as the same club
+TEAM_MATCH_THRESHOLD = 90
+CLUB_AFFIXES = {'fc', 'cf', 'afc', 'sc', 'ac', 'ssc', 'club', 'de', 'futbol', 'football'}
+
+crest_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="club-crest")
+_pending = {}
+_pending_lock = threading.Lock()
+# Crests resolved before their player's row was stored, claimed by the insert paths
+_awaiting = OrderedDict()
+AWAITING_MAX = 256
+
+def club_key(name):
+    """
+    Strips punctuation and affixes like "F.C." so club names from different sites compare equal.
+
+    Args:
+        name (str): A club name.
+
+    Returns:
+        str: The comparable name.
+    """
+    words = re.sub(r"[^\w\s]", "", name.casefold()).split()
+    return ' '.join(word for word in words if word not in CLUB_AFFIXES)
+
+def team_crest(club):
+    """
+    Returns the stored image of a team matching the club name, or None.
+
+    Args:
+        club (str): The club name from the player's infobox.
+
+    Returns:
+        str: The team image URL or None.
+    """
+    db = SessionLocal()
+    try:
+        key = club_key(club)
+        best, best_score = None, TEAM_MATCH_THRESHOLD - 1
+        for team in db.query(models.Team).filter(models.Team.team_img != None).all():  # pylint: disable=singleton-comparison
+            score = fuzz.ratio(key, club_key(team.team_name))
+            if score > best_score:
+                best, best_score = team.team_img, score
+        return best
+    finally:
+        db.close()
+
+@instrumented
+@cached_link('club_crest')
+def resolve_crest(club):
+    """
+    Finds a club's crest, from the team table or from its Wikipedia infobox.
+
+    Args:
+        club (str): The club name.
+
+    Returns:
+        str: The crest image URL or an error message if not found.
+    """
+    crest = team_crest(club)
+    if crest:
+        return crest
+    link = find_wikipedia_link(club)
+    if is_miss(link):
+        return f"No crest found for {club}"
+    record = read_infobox(get_page(link, CREST_READY, blocking='wikipedia'))
+    if record is None or not record.image:
+        return f"No crest found for {club}"
+    return record.image
+
+def _resolve_in_background(club):
+    try:
+        crest = resolve_crest(club)
+    except Exception as e:
+        print(f"Error resolving club crest: {e}")
+        crest = None
+    with _pending_lock:
+        players = _pending.pop(club, set())
+    if is_miss(crest) or not players:
+        return
+    db = SessionLocal()
+    try:
+        # Held until the crests of missing rows are parked, so an insert committed meanwhile finds them in claim_crest
+        with _pending_lock:
+            db.query(models.Player).filter(
+                models.Player.name.in_(players),
+                or_(models.Player.club_img == "", models.Player.club_img == None)  # pylint: disable=singleton-comparison
+            ).update({models.Player.club_img: crest}, synchronize_session=False)
+            db.commit()
+            stored = {name for (name,) in db.query(models.Player.name).filter(models.Player.name.in_(players))}
+            for name in players - stored:
+                _awaiting[name] = crest
+                _awaiting.move_to_end(name)
+            while len(_awaiting) > AWAITING_MAX:
+                _awaiting.popitem(last=False)
+    except Exception as e:
+        print(f"Error saving club crest: {e}")
+    finally:
+        db.close()
+
+def club_crest(club, player_name=None):
+    """
+    Returns a club's crest without waiting on the network.
+
+    Cached crests and crests of clubs in the team table are returned directly.
+    Otherwise the crest is resolved in the background, an empty string is
+    returned, and the player's stored club_img is filled in once it is found.
+
+    Args:
+        club (str): The club name.
+        player_name (str): The player whose row should receive the crest.
+
+    Returns:
+        str: The crest image URL, or "" if it is not known yet.
+    """
+    try:
+        hit, crest = lookup('club_crest', club)
+        if hit:
+            return "" if is_miss(crest) else crest
+        crest = team_crest(club)
+        if crest:
+            store('club_crest', club, crest)
+            return crest
+    except Exception as e:
+        print(f"Error reading club crest cache: {e}")
+    with _pending_lock:
+        queued = club in _pending
+        players = _pending.setdefault(club, set())
+        if player_name:
+            players.add(player_name)
+    if not queued:
+        crest_executor.submit(_resolve_in_background, club)
+    return ""
+
+def claim_crest(player):
+    """
+    Fills in a crest resolved in the background before the player's row was stored.
+
+    The cold lookup stores a player only after its stats and news are
+    scraped, so the background resolution often finishes first and finds no
+    row to update. Call this once the row is committed; the caller commits
+    the change.
+
+    Args:
+        player (models.Player): The stored player.
+
+    Returns:
+        bool: True if the player's club_img was set.
+    """
+    if player.club_img:
+        return False
+    with _pending_lock:
+        crest = _awaiting.pop(player.name, None)
+    if not crest:
+        return False
+    player.club_img = crest
+    return True
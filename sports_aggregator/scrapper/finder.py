@@ -2,12 +2,14 @@
 Module for finding links related to football teams and players using web scraping.
 """
 #pylint: disable=  unused-import,trailing-whitespace,line-too-long,duplicate-code
-from bs4 import BeautifulSoup as bs
-from repository.browser import init_driver, WebDriverWait, EC, By
+from repository.link_cache import cached_link
+from repository.telemetry import instrumented
+from .search import search_results, GOOGLE_BASE
+from .resolvers import register, resolve, FunctionResolver
 
-def find_team_link(name):
+def google_team_link(name):
     """
-    Finds and returns the WhoScored link for a given team name.
+    Finds and returns the WhoScored link for a given team name through a Google search.
     
     Args:
         name (str): The name of the football team.
@@ -15,31 +17,25 @@ def find_team_link(name):
     Returns:
         str: The WhoScored link for the team if found, otherwise an error message.
     """
-    driver = init_driver()
-    try:
-        query = '+'.join(name.split()) + '+stats'
-        search_url = f'https://www.google.com/search?q={query}+football+details+whoscored.com'
-        driver.get(search_url)
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, 'div.g')))
-        soup = bs(driver.page_source, 'html.parser')
-        link = None
-        for item in soup.select('div.g a[href]'):
-            try:
-                link = item['href']
-                if 'www.whoscored.com' in link:
-                    link = link.split('&')[0]  # Clean up unnecessary parameters
-                    break
-            except KeyError as e:
-                print(f"KeyError: {e}")
-            except Exception as e:
-                print(f"Exception: {e}")
-        return link if link else f"No WhoScored link found for {name}"
-    finally:
-        driver.quit()
+    query = '+'.join(name.split()) + '+stats'
+    search_url = f'{GOOGLE_BASE}/search?q={query}+football+details+whoscored.com'
+    soup = search_results(search_url, 10)
+    link = None
+    for item in soup.select('div.g a[href]'):
+        try:
+            link = item['href']
+            if 'www.whoscored.com' in link:
+                link = link.split('&')[0]  # Clean up unnecessary parameters
+                break
+        except KeyError as e:
+            print(f"KeyError: {e}")
+        except Exception as e:
+            print(f"Exception: {e}")
+    return link if link else f"No WhoScored link found for {name}"
 
-def team_player_link(name):
+def google_team_player_link(name):
     """
-    Finds and returns the Transfermarkt link for a given team player name.
+    Finds and returns the Transfermarkt link for a given team player name through a Google search.
     
     Args:
         name (str): The name of the football team player.
@@ -47,31 +43,25 @@ def team_player_link(name):
     Returns:
         str: The Transfermarkt link for the player if found, otherwise None.
     """
-    driver = init_driver()
-    try:
-        query = '+'.join(name.split()) + '+stats'
-        search_url = f'https://www.google.com/search?q={query}+transfermarkt.co.in+club+profile/'
-        driver.get(search_url)
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, 'div.g')))
-        soup = bs(driver.page_source, 'html.parser')
-        link = None
-        for item in soup.select('div.g a[href]'):
-            try:
-                link = item['href']
-                if 'www.transfermarkt.co.in' in link:
-                    link = link.split('&')[0]  # Clean up unnecessary parameters
-                    break
-            except KeyError as e:
-                print(f"KeyError: {e}")
-            except Exception as e:
-                print(f"Exception: {e}")
-        return link
-    finally:
-        driver.quit()
+    query = '+'.join(name.split()) + '+stats'
+    search_url = f'{GOOGLE_BASE}/search?q={query}+transfermarkt.co.in+club+profile/'
+    soup = search_results(search_url, 10)
+    link = None
+    for item in soup.select('div.g a[href]'):
+        try:
+            link = item['href']
+            if 'www.transfermarkt.co.in' in link:
+                link = link.split('&')[0]  # Clean up unnecessary parameters
+                break
+        except KeyError as e:
+            print(f"KeyError: {e}")
+        except Exception as e:
+            print(f"Exception: {e}")
+    return link
 
-def team_news_link(team_name):
+def google_team_news_link(team_name):
     """
-    Finds and returns the ESPN link for current football news related to a team.
+    Finds and returns the ESPN link for current football news related to a team through a Google search.
     
     Args:
         team_name (str): The name of the football team.
@@ -80,25 +70,76 @@ def team_news_link(team_name):
         str: The ESPN link for current team news if found, otherwise an empty string.
     """
     query = '+'.join(team_name.split())
-    search_url = f'https://www.google.com/search?q={query}+espn.com+football+current+news'
-    browser = init_driver()
-    try:
-        browser.get(search_url) 
-        WebDriverWait(browser, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, 'div.g')))
-        soup = bs(browser.page_source, 'html.parser')
-        link = None
-        for item in soup.select('div.g a[href]'):
-            try:
-                link = item['href']
-                if (link.startswith('https://www.espn.in/football/') or 
-                    link.startswith('https://www.espn.com/soccer/')) and '/story/' not in link:
-                    link = link.split('&')[0]  # Clean up unnecessary parameters
-                    break
-            except KeyError as e:
-                print(f"KeyError: {e}")
-            except Exception as e:
-                print(f"Exception: {e}")
-            print(link)
-        return link if link else ''
-    finally:
-        browser.quit()
+    search_url = f'{GOOGLE_BASE}/search?q={query}+espn.com+football+current+news'
+    soup = search_results(search_url, 20)
+    link = None
+    for item in soup.select('div.g a[href]'):
+        try:
+            link = item['href']
+            if (link.startswith('https://www.espn.in/football/') or 
+                link.startswith('https://www.espn.com/soccer/')) and '/story/' not in link:
+                link = link.split('&')[0]  # Clean up unnecessary parameters
+                break
+        except KeyError as e:
+            print(f"KeyError: {e}")
+        except Exception as e:
+            print(f"Exception: {e}")
+        print(link)
+    return link if link else ''
+
+register('whoscored_team', FunctionResolver('google', google_team_link))
+
+@instrumented
+@cached_link('whoscored_team')
+def find_team_link(name):
+    """
+    Finds and returns the WhoScored link for a given team name.
+
+    Tries the site APIs and site searches of the resolver registry before Google.
+
+    Args:
+        name (str): The name of the football team.
+
+    Returns:
+        str: The WhoScored link for the team if found, otherwise an error message.
+    """
+    link = resolve('whoscored_team', name)
+    return link if link else f"No WhoScored link found for {name}"
+
+register('transfermarkt_team', FunctionResolver('google', google_team_player_link))
+
+@instrumented
+@cached_link('transfermarkt_team')
+def team_player_link(name):
+    """
+    Finds and returns the Transfermarkt link for a given team player name.
+
+    Tries the site APIs and site searches of the resolver registry before Google.
+
+    Args:
+        name (str): The name of the football team player.
+
+    Returns:
+        str: The Transfermarkt link for the player if found, otherwise None.
+    """
+    link = resolve('transfermarkt_team', name)
+    return link if link else None
+
+register('espn_team_news', FunctionResolver('google', google_team_news_link))
+
+@instrumented
+@cached_link('espn_team_news')
+def team_news_link(team_name):
+    """
+    Finds and returns the ESPN link for current football news related to a team.
+
+    Tries the site APIs and site searches of the resolver registry before Google.
+
+    Args:
+        team_name (str): The name of the football team.
+
+    Returns:
+        str: The ESPN link for current team news if found, otherwise an empty string.
+    """
+    link = resolve('espn_team_news', team_name)
+    return link if link else ''
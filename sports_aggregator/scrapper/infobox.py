@@ -0,0 +1,153 @@
+"""
+Module reading Wikipedia infoboxes into label-keyed records.
+
+The infobox table is walked once: every row's label and cleaned value go
+into a mapping, along with the microformat classes MediaWiki puts on data
+cells, the age span and the main image. Player fields are then looked up by
+label instead of by row position. Records are cached per page revision, so
+the player name and player data steps share a single parse.
+"""
+#pylint: disable=  trailing-whitespace,line-too-long
+import re
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from bs4 import BeautifulSoup, SoupStrainer
+from repository.parsing import parse, class_token
+
+INFOBOX_ONLY = SoupStrainer('table', class_=class_token('infobox'))
+
+BRACKETS = re.compile(r"\[.*?\]")
+REVISION_PATTERN = re.compile(r'"wgRevisionId":\s*(\d+)')
+CANONICAL_PATTERN = re.compile(r'<link rel="canonical" href="([^"]+)"')
+
+InfoboxRecord = namedtuple('InfoboxRecord', ['fields', 'classes', 'age', 'image', 'revision'])
+InfoboxRecord.__doc__ = """
+A parsed infobox: `fields` maps row labels to cleaned values, `classes` maps
+data cell classes such as 'nickname' or 'org' to values, `age` is the
+"(age N)" text, `image` the main image URL and `revision` the cache key.
+"""
+
+# Labels tried in order for each player field, then the data cell class MediaWiki marks it with
+PLAYER_FIELDS = {
+    'name': (('Full name', 'Birth name', 'Name'), 'nickname'),
+    'country': (('Place of birth',), 'birthplace'),
+    'height': (('Height',), None),
+    'positions': (('Position(s)', 'Position'), 'role'),
+    'shirt_no': (('Number',), None),
+    'club': (('Current team', 'Current club', 'Club'), 'org'),
+}
+
+INFOBOX_CACHE_SIZE = 256
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def clean(text):
+    """
+    Strips whitespace, newlines and footnote markers like "[1]" from cell text.
+
+    Args:
+        text (str): Raw cell text.
+
+    Returns:
+        str: The cleaned value.
+    """
+    return BRACKETS.sub("", text.strip().replace('\n', ''))
+
+def revision_key(page):
+    """
+    Identifies a page revision: Wikipedia's revision id and canonical URL, or a hash of the HTML.
+
+    Args:
+        page (str): Raw page HTML.
+
+    Returns:
+        str: The cache key.
+    """
+    revision = REVISION_PATTERN.search(page)
+    canonical = CANONICAL_PATTERN.search(page)
+    if revision:
+        return f"{canonical.group(1) if canonical else ''}@{revision.group(1)}"
+    return hashlib.sha1(page.encode('utf-8', errors='replace')).hexdigest()
+
+def extract_infobox(soup):
+    """
+    Walks an infobox table once into an InfoboxRecord.
+
+    Args:
+        soup (BeautifulSoup): A page or strained subtree containing the infobox.
+
+    Returns:
+        InfoboxRecord: The record, with revision None; or None if there is no infobox.
+    """
+    table = soup.find('table', class_='infobox') if soup.name != 'table' else soup
+    if table is None:
+        return None
+    fields, classes, age, image = {}, {}, None, None
+    for row in table.find_all('tr'):
+        data = row.find('td', class_='infobox-data')
+        if data is None:
+            if image is None:
+                cell = row.find('td', class_='infobox-image')
+                img = cell.find('img', class_='mw-file-element') if cell else None
+                if img is not None and img.get('src'):
+                    image = img.get('src').strip().replace('\n', '')
+            continue
+        value = clean(data.text)
+        label = row.find('th', class_='infobox-label')
+        if label is not None:
+            fields.setdefault(clean(label.text), value)
+        for name in data.get('class', []):
+            if name != 'infobox-data':
+                classes.setdefault(name, value)
+        if age is None:
+            span = data.find('span', class_='ForceAgeToShow')
+            if span is not None:
+                age = clean(span.text)
+    return InfoboxRecord(fields, classes, age, image, None)
+
+def read_infobox(page):
+    """
+    Returns the infobox record of a page, parsing each page revision only once.
+
+    Args:
+        page (str | BeautifulSoup | InfoboxRecord): Raw HTML, an already parsed soup, or a record.
+
+    Returns:
+        InfoboxRecord: The record, or None if the page has no infobox.
+    """
+    if isinstance(page, InfoboxRecord) or page is None:
+        return page
+    if isinstance(page, BeautifulSoup):
+        return extract_infobox(page)
+    key = revision_key(page)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    record = extract_infobox(parse(page, INFOBOX_ONLY))
+    if record is not None:
+        record = record._replace(revision=key)
+        with _cache_lock:
+            _cache[key] = record
+            while len(_cache) > INFOBOX_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return record
+
+def field(record, key, default=None):
+    """
+    Looks up a player field by its labels, then by its data cell class.
+
+    Args:
+        record (InfoboxRecord): The parsed infobox.
+        key (str): One of PLAYER_FIELDS.
+        default (str): Value returned if the infobox does not have the field.
+
+    Returns:
+        str: The value, or the default.
+    """
+    labels, cell_class = PLAYER_FIELDS[key]
+    for label in labels:
+        if label in record.fields:
+            return record.fields[label]
+    return record.classes.get(cell_class, default) if cell_class else default
@@ -0,0 +1,230 @@
+"""
+Module resolving team and player names to source links without a search engine where possible.
+
+Each link kind has a chain of resolvers tried in order: the Wikipedia search
+API and the ESPN search API over plain HTTP first, then the site's own search
+page for WhoScored and Transfermarkt, and Google (registered by search.py and
+finder.py) last. Every resolver has a `base_url` that can be pointed at a
+local stub, through its environment variable or by setting the attribute.
+"""
+#pylint: disable=  trailing-whitespace,line-too-long,broad-except,import-error
+import os
+import re
+import logging
+from abc import ABC, abstractmethod
+from urllib.parse import quote, quote_plus, urljoin
+from bs4 import SoupStrainer
+from fuzzywuzzy import fuzz
+from repository.browser import element_ready
+from repository.fetcher import get_page, get_json
+from repository.link_cache import is_miss
+from repository.parsing import parse
+from .scrapper_team import accept_consent
+
+logger = logging.getLogger(__name__)
+
+LINKS_ONLY = SoupStrainer('a', href=True)
+
+class Resolver(ABC):
+    """
+    A way of turning a name into a link. Returns None when it finds nothing.
+    """
+    name = 'resolver'
+    default_base_url = None
+
+    def __init__(self, base_url=None):
+        self.base_url = (base_url or self.default_base_url or '').rstrip('/')
+
+    @abstractmethod
+    def resolve(self, query):
+        """
+        Resolves a name to a link.
+
+        Args:
+            query (str): The team or player name.
+
+        Returns:
+            str: The link, or None.
+        """
+
+class WikipediaSearch(Resolver):
+    """
+    Wikipedia's search API, one plain HTTP request.
+
+    Full-text search ranks any page mentioning the words first, so a hit is
+    only accepted when its title matches the name and the title or snippet
+    is about football; otherwise the next resolver is tried.
+    """
+    name = 'wikipedia_api'
+    default_base_url = os.getenv("SCRAPER_WIKIPEDIA_BASE", "https://en.wikipedia.org")
+    # Minimum token set similarity of query and title, ignoring a "(footballer, born 1990)" suffix
+    TITLE_MATCH_THRESHOLD = 85
+    FOOTBALL = re.compile(r"football|soccer|\bF\.?C\b", re.IGNORECASE)
+    QUALIFIER = re.compile(r"\s*\([^)]*\)$")
+
+    def accepts(self, query, result):
+        """
+        Checks that a search hit is the football page of the queried name.
+
+        Args:
+            query (str): The team or player name.
+            result (dict): A hit of the search API, with 'title' and 'snippet'.
+
+        Returns:
+            bool: True if the hit can be used.
+        """
+        title = result.get('title', '')
+        if fuzz.token_set_ratio(query.casefold(), self.QUALIFIER.sub('', title).casefold()) < self.TITLE_MATCH_THRESHOLD:
+            return False
+        return bool(self.FOOTBALL.search(title) or self.FOOTBALL.search(result.get('snippet', '')))
+
+    def resolve(self, query):
+        url = f"{self.base_url}/w/api.php?action=query&list=search&srnamespace=0&srlimit=5&format=json&srsearch={quote_plus(query + ' football')}"
+        for result in get_json(url).get('query', {}).get('search', []):
+            if self.accepts(query, result):
+                return f"https://en.wikipedia.org/wiki/{quote(result['title'].replace(' ', '_'))}"
+        logger.info("No Wikipedia search hit matches %s", query)
+        return None
+
+class EspnSearch(Resolver):
+    """
+    ESPN's site search API, filtered to team or player pages.
+    """
+    name = 'espn_api'
+    default_base_url = os.getenv("SCRAPER_ESPN_SEARCH_BASE", "https://site.web.api.espn.com")
+    PATTERNS = {
+        'team': re.compile(r"^https://www\.espn\.(?:in/football|com/soccer)/(?:team|club)/"),
+        'player': re.compile(r"^https://www\.espn\.(?:in/football|com/soccer)/player/"),
+    }
+
+    def __init__(self, kind, base_url=None):
+        super().__init__(base_url)
+        self.kind = kind
+
+    def resolve(self, query):
+        data = get_json(f"{self.base_url}/apis/search/v2?limit=10&query={quote_plus(query)}")
+        for group in data.get('results', []):
+            for item in group.get('contents', []):
+                link = item.get('link')
+                link = link.get('web') if isinstance(link, dict) else link
+                if link and self.PATTERNS[self.kind].match(link):
+                    return link
+        return None
+
+class SiteSearch(Resolver):
+    """
+    A site's own search page, rendered like any other page of the site.
+    """
+    site = None
+    path = None
+    link_pattern = None
+    ready = None
+    blocking = None
+    prepare = None
+
+    def resolve(self, query):
+        page = get_page(f"{self.base_url}{self.path}{quote_plus(query)}", self.ready, prepare=self.prepare, blocking=self.blocking)
+        for anchor in parse(page, LINKS_ONLY).find_all('a', href=True):
+            if self.link_pattern.search(anchor['href']):
+                return urljoin(self.site, anchor['href'])
+        return None
+
+class WhoScoredSearch(SiteSearch):
+    """
+    WhoScored's search page, for team or player links.
+    """
+    name = 'whoscored_search'
+    site = 'https://www.whoscored.com'
+    default_base_url = os.getenv("SCRAPER_WHOSCORED_BASE", site)
+    path = '/Search/?t='
+    ready = element_ready('whoscored search', 'div.search-result', 10)
+    blocking = 'whoscored'
+    PATTERNS = {
+        'team': re.compile(r"/teams/\d+/show/", re.IGNORECASE),
+        'player': re.compile(r"/players/\d+/show/", re.IGNORECASE),
+    }
+
+    def __init__(self, kind, base_url=None):
+        super().__init__(base_url)
+        self.link_pattern = self.PATTERNS[kind]
+
+class TransfermarktSearch(SiteSearch):
+    """
+    Transfermarkt's quick search, for club profile links.
+    """
+    name = 'transfermarkt_search'
+    site = 'https://www.transfermarkt.co.in'
+    default_base_url = os.getenv("SCRAPER_TRANSFERMARKT_BASE", site)
+    path = '/schnellsuche/ergebnis/schnellsuche?query='
+    link_pattern = re.compile(r"/startseite/verein/\d+")
+    ready = element_ready('transfermarkt search', 'table.items', 10)
+    blocking = 'transfermarkt'
+    prepare = staticmethod(accept_consent)
+
+class FunctionResolver(Resolver):
+    """
+    Adapts a finder function, such as a Google search, to the resolver interface.
+    """
+
+    def __init__(self, name, func, base_url=None):
+        super().__init__(base_url)
+        self.name = name
+        self.func = func
+
+    def resolve(self, query):
+        link = self.func(query)
+        return None if is_miss(link) else link
+
+REGISTRY = {
+    'wikipedia': [WikipediaSearch()],
+    'whoscored_team': [WhoScoredSearch('team')],
+    'whoscored_player': [WhoScoredSearch('player')],
+    'transfermarkt_team': [TransfermarktSearch()],
+    'espn_team_news': [EspnSearch('team')],
+    'espn_player_news': [EspnSearch('player')],
+}
+
+def register(kind, resolver, first=False):
+    """
+    Adds a resolver to the chain of a link kind.
+
+    Args:
+        kind (str): Link kind, the same key the link cache uses, e.g. 'whoscored_team'.
+        resolver (Resolver): The resolver.
+        first (bool): Try it before the existing resolvers instead of after them.
+    """
+    chain = REGISTRY.setdefault(kind, [])
+    if first:
+        chain.insert(0, resolver)
+    else:
+        chain.append(resolver)
+
+def resolve(kind, query):
+    """
+    Tries the resolvers of a link kind in order and returns the first link found.
+
+    If none finds a link and the last one failed with an error, that error is
+    raised, so a failed search (e.g. a CAPTCHA) is not cached as a miss.
+
+    Args:
+        kind (str): Link kind.
+        query (str): The team or player name.
+
+    Returns:
+        str: The link, or None if every resolver came back empty.
+    """
+    error = None
+    for resolver in REGISTRY.get(kind, []):
+        try:
+            link = resolver.resolve(query)
+        except Exception as e:
+            logger.info("%s resolver failed for %r: %s", resolver.name, query, e)
+            error = e
+            continue
+        if link:
+            logger.info("%s resolved %r via %s", kind, query, resolver.name)
+            return link
+        error = None
+    if error is not None:
+        raise error
+    return None
@@ -3,13 +3,25 @@ Module for scraping football player data from various sources.
 """
 #pylint: disable=  unused-import,trailing-whitespace,line-too-long,broad-except,duplicate-code,import-error
 from urllib.parse import unquote
-import time
-import re
-from selenium import webdriver
-from bs4 import BeautifulSoup as bs
+from bs4 import SoupStrainer
 from db_model.schemas import schema
-from repository.browser import init_driver
+from repository.browser import element_ready, rows_ready
+from repository.fetcher import get_page
+from repository.link_cache import report_broken_link
+from repository.parsing import parse, page_title, class_token
+from repository.telemetry import instrumented
 from .search import find_stat_link, find_wikipedia_link, find_news_link
+from .scrapper_team import extract_news, ARTICLES_ONLY
+from .crests import club_crest
+from .infobox import INFOBOX_ONLY, BRACKETS, read_infobox, field
+
+INFOBOX_READY = element_ready('infobox', 'td.infobox-image img', 10)
+PLAYER_STATS_READY = rows_ready('player stats', 'table.grid.with-centered-columns.hover tbody', 10)
+NEWS_MENU_READY = element_ready('news menu', 'ul.Nav__Secondary__Menu li a', 10)
+ARTICLES_READY = element_ready('articles', 'article', 8)
+
+PLAYER_STATS_ONLY = SoupStrainer('table', class_="grid with-centered-columns hover")
+NEWS_MENU_ONLY = SoupStrainer('ul', class_='Nav__Secondary__Menu center flex items-center relative')
 
 def remove_square_brackets(content):
     """
@@ -21,83 +33,69 @@ def remove_square_brackets(content):
     Returns:
         str: The cleaned content.
     """
-    pattern = r"\[.*?\]"
-    return re.sub(pattern, "", content)
+    return BRACKETS.sub("", content)
 
-def scrape_player_data(soup):
+@instrumented
+def scrape_player_data(infobox):
     """
     Scrapes basic player data from a Wikipedia page.
 
+    Fields are looked up by infobox label, so a row missing from a player's
+    infobox is reported as 'unknown' instead of shifting the others.
+
     Args:
-        soup (BeautifulSoup): The BeautifulSoup object of the player's Wikipedia page.
+        infobox (InfoboxRecord | str | BeautifulSoup): The record returned by scrape_player_name, or the player's Wikipedia page.
 
     Returns:
         schema.Playerbase: Player information structured according to schema.
     """
     try:
-        name = remove_square_brackets(soup.find('td', class_="infobox-data nickname").text.strip().replace('\n', ''))
-        country = remove_square_brackets(soup.find('td', class_="infobox-data birthplace").text.strip().replace('\n', ''))
-        height = remove_square_brackets(soup.find_all('td', class_="infobox-data")[3].text.strip().replace('\n', ''))
-        position = remove_square_brackets(soup.find('td', class_="infobox-data role").text.strip().replace('\n', ''))
-        
-        try:
-            age = remove_square_brackets(soup.find('span', class_="noprint ForceAgeToShow").text.strip().replace('\n', ''))
-        except:
-            age = 'unknown'
-        
-        shirt_no = remove_square_brackets(soup.find_all('td', class_="infobox-data")[6].text.strip().replace('\n', ''))
-        item = soup.find('td', class_="infobox-image")
-        player_img = item.find('img', class_='mw-file-element').get('src').strip().replace('\n', '')
+        record = read_infobox(infobox)
+        name = field(record, 'name')
         club_img = ""
         
         try:
-            browser = webdriver.Chrome()
-            time.sleep(7)
-            link = find_wikipedia_link(soup.find('td', class_="infobox-data org").text.strip().replace('\n', ''))
-            browser.get(link)
-            time.sleep(7)
-            soup = bs(browser.page_source, "html.parser")
-            item = soup.find('td', class_="infobox-image")
-            club_img = item.find('img', class_='mw-file-element').get('src').strip().replace('\n', '')
-            print(club_img, "link: ", link)
+            club = field(record, 'club')
+            if club:
+                club_img = club_crest(club, name)
         except Exception as e:
             print(f"Error scraping club image: {e}")
-        finally:
-            browser.quit()
         
         player = schema.Playerbase(
             name=name, 
-            positions=position, 
-            age=age, 
-            country=country, 
-            height=height, 
-            shirt_no=shirt_no, 
-            player_img=player_img, 
+            positions=field(record, 'positions', 'unknown'), 
+            age=record.age or 'unknown', 
+            country=field(record, 'country', 'unknown'), 
+            height=field(record, 'height', 'unknown'), 
+            shirt_no=field(record, 'shirt_no', 'unknown'), 
+            player_img=record.image, 
             club_img=club_img
         )
         return player
     except Exception as e:
         print(f"Error scraping player data: {e}")
 
-def scrape_player_stats(name):
+@instrumented
+def scrape_player_stats(name, strict=False):
     """
     Scrapes player statistics from a stats link.
 
     Args:
         name (str): The name of the player.
+        strict (bool): Raise scraping errors instead of returning the stats found so far.
 
     Returns:
         list: A list of schema.StatsBase objects containing player statistics.
     """
     stats = []
     try:
-        link = find_stat_link(name)
-        browser = init_driver()
-        link = unquote(unquote(link))
-        browser.get(link)
-        time.sleep(5)
-        soup = bs(browser.page_source, "html.parser")
-        table = soup.find('table', class_="grid with-centered-columns hover")
+        stat_link = find_stat_link(name)
+        link = unquote(unquote(stat_link))
+        page = get_page(link, PLAYER_STATS_READY, blocking='whoscored')
+        table = parse(page, PLAYER_STATS_ONLY).find('table', class_="grid with-centered-columns hover")
+        if table is None:
+            report_broken_link(stat_link, page_title(page))
+            return stats
         rows = table.find_all('tr')
         
         for row in rows:
@@ -114,11 +112,12 @@ def scrape_player_stats(name):
                     rating=cells[11].text.strip().replace('\n', ''),
                 ))
     except Exception as e:
+        if strict:
+            raise
         print(f"Error scraping player stats: {e}")
-    finally:
-        browser.quit()
-        return stats
+    return stats
 
+@instrumented
 def scrape_player_news(name):
     """
     Scrapes player-related news articles.
@@ -130,51 +129,22 @@ def scrape_player_news(name):
         list: A list of schema.NewsBase objects containing player news articles.
     """
     try:
-        link = find_news_link(name)
-        browser = init_driver()
-        browser.get(link)
-        soup = bs(browser.page_source, "html.parser")
-        link = soup.find('ul', class_='Nav__Secondary__Menu center flex items-center relative').find_all('li')[2].find('a').get('href')
+        news_link = find_news_link(name)
+        page = get_page(news_link, NEWS_MENU_READY, blocking='espn')
+        menu = parse(page, NEWS_MENU_ONLY).find('ul', class_='Nav__Secondary__Menu center flex items-center relative')
+        if menu is None:
+            report_broken_link(news_link, page_title(page))
+            return []
+        link = menu.find_all('li')[2].find('a').get('href')
         link = 'https://espn.in' + link
         link = unquote(unquote(link))
 
-        browser.get(link)
-        time.sleep(5)
-        soup = bs(browser.page_source, "html.parser")
-        articles = soup.find_all('article')
-        news_items = []
-
-        for article in articles:
-            img = ""
-            link = ""
-            title = ""
-
-            # Find image container and extract image source
-            container = article.find('div', class_="Image__Wrapper aspect-ratio--child")
-            if container:
-                img_tag = container.find('img')
-                if img_tag:
-                    img = img_tag.get('src')
-
-            # Find link container and extract link and title
-            link_container = article.find('div', class_="ResponsiveWrapper")
-            if link_container:
-                link_tag = link_container.find('a')
-                if link_tag:
-                    link = 'https://www.espn.in' + link_tag.get('href')
-
-                title_tag = link_container.find('h2', class_="contentItem__title")
-                if title_tag:
-                    title = title_tag.text.strip()
-
-            news_items.append(schema.NewsBase(news_img=img, news_title=title, news_link=link))
-
-        return news_items
+        soup = parse(get_page(link, ARTICLES_READY, blocking='espn'), ARTICLES_ONLY)
+        return [schema.NewsBase(**item) for item in extract_news(soup)]
     except Exception as e:
         print(f"Error scraping player news: {e}")
-    finally:
-        browser.quit()
 
+@instrumented
 def scrape_player_name(name):
     """
     Scrapes the official name of a player from Wikipedia.
@@ -183,22 +153,22 @@ def scrape_player_name(name):
         name (str): The name of the player.
 
     Returns:
-        str: The official name of the player.
+        tuple: The official name of the player and the parsed infobox (InfoboxRecord), or None if not found.
     """
     try:
-        link = find_wikipedia_link(name)
-        time.sleep(7)
-        link = unquote(unquote(link))
-        browser = init_driver()
-        browser.get(link)
-        soup = bs(browser.page_source, "html.parser")
-        name = remove_square_brackets(soup.find('td', class_="infobox-data nickname").text.strip().replace('\n', ''))
-        return name, soup
+        wiki_link = find_wikipedia_link(name)
+        link = unquote(unquote(wiki_link))
+        page = get_page(link, INFOBOX_READY, blocking='wikipedia')
+        record = read_infobox(page)
+        name = field(record, 'name') if record else None
+        if name is None:
+            report_broken_link(wiki_link, page_title(page))
+            return None
+        return name, record
     except Exception as e:
         print(f"Error scraping player name: {e}")
-    finally:
-        browser.quit()
 
+@instrumented
 def find_articles(name):
     """
     Finds news articles related to a player.
@@ -209,17 +179,13 @@ def find_articles(name):
     Returns:
         list: A list of news articles as HTML strings.
     """
+    articles = []
     try:
         link = find_news_link(name)
         link = unquote(unquote(link))
-        browser = init_driver()
-        browser.get(link)
-        time.sleep(5)
-        soup = bs(browser.page_source, "html.parser")
+        soup = parse(get_page(link, ARTICLES_READY, blocking='espn'), ARTICLES_ONLY)
         articles = soup.find_all('article')
         articles = [str(item) for item in articles]
     except Exception as e:
         print(f"Error finding articles: {e}")
-    finally:
-        browser.quit()
-        return articles
+    return articles
@@ -2,11 +2,40 @@
 Module for finding Wikipedia, WhoScored, and ESPN news links related to football players.
 """
 #pylint: disable=  unused-import,trailing-whitespace,line-too-long,broad-except,duplicate-code
-from bs4 import BeautifulSoup as bs
-from repository.browser import WebDriverWait, EC, By, init_driver
-def find_wikipedia_link(name):
+import os
+from repository.parsing import parse, SERP_RESULTS_ONLY
+from repository.browser import WebDriverWait, EC, By, TimeoutException, element_ready
+from repository.fetcher import get_page
+from repository.snapshots import snapshot_cache
+from repository.link_cache import cached_link
+from repository.telemetry import instrumented
+from .resolvers import register, resolve, FunctionResolver
+
+GOOGLE_BASE = os.getenv("SCRAPER_GOOGLE_BASE", "https://www.google.com")
+
+def search_results(search_url, timeout):
     """
-    Finds the Wikipedia link for a football player's name.
+    Loads a Google results page and returns its parsed result blocks.
+
+    Args:
+        search_url (str): The Google search URL.
+        timeout (float): Longest wait for results to render.
+
+    Raises:
+        TimeoutException: If no results rendered, e.g. on a CAPTCHA page, so that nothing gets cached.
+
+    Returns:
+        BeautifulSoup: The `div.g` result blocks.
+    """
+    soup = parse(get_page(search_url, element_ready('search results', 'div.g', timeout), blocking='serp'), SERP_RESULTS_ONLY)
+    if soup.find('div') is None:
+        snapshot_cache.discard(search_url)
+        raise TimeoutException(f"No search results at {search_url}")
+    return soup
+
+def google_wikipedia_link(name):
+    """
+    Finds the Wikipedia link for a football player's name through a Google search.
 
     Args:
         name (str): The name of the football player.
@@ -15,12 +44,9 @@ def find_wikipedia_link(name):
         str: The Wikipedia link or an error message if not found.
     """
     query = '+'.join(name.split())
-    search_url = f'https://www.google.com/search?q={query}+football+wikipedia'
-    browser = init_driver()
-    browser.get(search_url)
-    WebDriverWait(browser, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, 'div.g')))
+    search_url = f'{GOOGLE_BASE}/search?q={query}+football+wikipedia'
+    soup = search_results(search_url, 10)
     
-    soup = bs(browser.page_source, 'html.parser')
     link = None
     
     for item in soup.select('div.g a[href]'):
@@ -31,14 +57,13 @@ def find_wikipedia_link(name):
                 break
         except Exception as e:
             print(f"Exception: {e}")
-    browser.quit()
     
     return link if link else f"No Wikipedia link found for {name}"
 
 
-def find_stat_link(name):
+def google_stat_link(name):
     """
-    Finds the statistics link for a football player's name on WhoScored.
+    Finds the statistics link for a football player's name on WhoScored through a Google search.
 
     Args:
         name (str): The name of the football player.
@@ -47,12 +72,9 @@ def find_stat_link(name):
         str: The WhoScored statistics link or an error message if not found.
     """
     query = '+'.join(name.split()) + '+stats'
-    search_url = f'https://www.google.com/search?q={query}+whoscored'
-    browser = init_driver()
-    browser.get(search_url)
-    WebDriverWait(browser, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, 'div.g')))
+    search_url = f'{GOOGLE_BASE}/search?q={query}+whoscored'
+    soup = search_results(search_url, 10)
     
-    soup = bs(browser.page_source, 'html.parser')
     link = None
     
     for item in soup.select('div.g a[href]'):
@@ -63,14 +85,13 @@ def find_stat_link(name):
                 break
         except Exception as e:
             print(f"Exception: {e}")
-    browser.quit()
     
     return link if link else f"No WhoScored link found for {name}"
 
 
-def find_news_link(name):
+def google_news_link(name):
     """
-    Finds the ESPN news link for a football player's name.
+    Finds the ESPN news link for a football player's name through a Google search.
 
     Args:
         name (str): The name of the football player.
@@ -79,12 +100,9 @@ def find_news_link(name):
         str: The ESPN news link or an empty string if not found.
     """
     query = '+'.join(name.split())
-    search_url = f'https://www.google.com/search?q={query}+espn.in+news'
-    browser = init_driver()
-    browser.get(search_url)
-    WebDriverWait(browser, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, 'div.g')))
+    search_url = f'{GOOGLE_BASE}/search?q={query}+espn.in+news'
+    soup = search_results(search_url, 20)
     
-    soup = bs(browser.page_source, 'html.parser')
     link = None
     
     for item in soup.select('div.g a[href]'):
@@ -95,6 +113,62 @@ def find_news_link(name):
                 break
         except Exception as e:
             print(f"Exception: {e}")
-    browser.quit()
     
     return link if link else ''
+
+register('wikipedia', FunctionResolver('google', google_wikipedia_link))
+
+@instrumented
+@cached_link('wikipedia')
+def find_wikipedia_link(name):
+    """
+    Finds the Wikipedia link for a football player's name.
+
+    Tries the site APIs and site searches of the resolver registry before Google.
+
+    Args:
+        name (str): The name of the football player.
+
+    Returns:
+        str: The Wikipedia link or an error message if not found.
+    """
+    link = resolve('wikipedia', name)
+    return link if link else f"No Wikipedia link found for {name}"
+
+register('whoscored_player', FunctionResolver('google', google_stat_link))
+
+@instrumented
+@cached_link('whoscored_player')
+def find_stat_link(name):
+    """
+    Finds the statistics link for a football player's name on WhoScored.
+
+    Tries the site APIs and site searches of the resolver registry before Google.
+
+    Args:
+        name (str): The name of the football player.
+
+    Returns:
+        str: The WhoScored statistics link or an error message if not found.
+    """
+    link = resolve('whoscored_player', name)
+    return link if link else f"No WhoScored link found for {name}"
+
+register('espn_player_news', FunctionResolver('google', google_news_link))
+
+@instrumented
+@cached_link('espn_player_news')
+def find_news_link(name):
+    """
+    Finds the ESPN news link for a football player's name.
+
+    Tries the site APIs and site searches of the resolver registry before Google.
+
+    Args:
+        name (str): The name of the football player.
+
+    Returns:
+        str: The ESPN news link or an empty string if not found.
+    """
+    link = resolve('espn_player_news', name)
+    return link if link else ''